@@ -34,6 +34,12 @@ setup(
     license='Apache 2.0',
     packages=find_packages(),
     install_requires=install_requires,
+    extras_require={
+        'pandas': ['pandas'],
+    },
+    entry_points={
+        'console_scripts': ['strongarm = strongarm.cli:main'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Programming Language :: Python',
@@ -3,6 +3,9 @@ stronglib - a Python library for the strongarm.io API
 
 """
 
+import importlib
+import sys
+
 
 __author__ = 'Percipient Networks, LLC'
 __version__ = '0.3.0'
@@ -13,10 +16,77 @@ host = 'https://dnswatch.watchguard.com'
 api_key = None
 api_version = '0.2.0'  # Developers generally should not change this.
 
+# Ask the API to compress responses.
+compression = True
+# Gzip encode request bodies of at least this many bytes, None to disable.
+request_compression_threshold = None
+# The default (connect, read) timeout in seconds for each request.
+timeout = (10, 60)
+# The strongarm.transports.Transport sending requests, None for the default
+# RequestsTransport.
+transport = None
+# The strongarm.common.Hedging policy for GET requests, None to disable.
+hedging = None
+# The strongarm.common.CircuitBreaker for requests, None to disable.
+circuit_breaker = None
+
 # This should never be set to True in a production environment and exists purely
 # for testing.
 _ignore_certificates = False
 
-from strongarm.common import (StrongarmException, StrongarmHttpError,
-                              StrongarmUnauthorized)
-from strongarm.resources import Domain, Infection
+# The public names of the package and the modules defining them. They are
+# imported on first access so that `import strongarm` stays cheap.
+_lazy_attributes = {
+    'AdaptiveLimit': 'strongarm.common',
+    'CircuitBreaker': 'strongarm.common',
+    'Deadline': 'strongarm.common',
+    'Hedging': 'strongarm.common',
+    'StrongarmCircuitOpen': 'strongarm.common',
+    'StrongarmDeadlineExceeded': 'strongarm.common',
+    'StrongarmException': 'strongarm.common',
+    'StrongarmHttpError': 'strongarm.common',
+    'StrongarmTimeout': 'strongarm.common',
+    'StrongarmUnauthorized': 'strongarm.common',
+    'Tenant': 'strongarm.common',
+    'fan_out': 'strongarm.common',
+    'metrics': 'strongarm.common',
+    'Domain': 'strongarm.resources',
+    'Infection': 'strongarm.resources',
+    'MutationQueue': 'strongarm.mutations',
+    'SnapshotFile': 'strongarm.snapshotfile',
+    'write_snapshot': 'strongarm.snapshotfile',
+}
+
+__all__ = sorted(['host', 'api_key', 'api_version', 'compression',
+                  'request_compression_threshold', 'timeout', 'transport',
+                  'hedging', 'circuit_breaker'] + list(_lazy_attributes))
+
+
+def __getattr__(name):
+    try:
+        module = _lazy_attributes[name]
+    except KeyError:
+        # Submodules such as strongarm.common are available as attributes, as
+        # they were when the package imported them eagerly.
+        submodule = '%s.%s' % (__name__, name)
+        try:
+            return importlib.import_module(submodule)
+        except ImportError as e:
+            if getattr(e, 'name', submodule) != submodule:
+                raise
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
+# Module level __getattr__ requires Python 3.7, import everything up front on
+# older versions.
+if sys.version_info < (3, 7):
+    for _name in _lazy_attributes:
+        __getattr__(_name)
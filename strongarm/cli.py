@@ -0,0 +1,273 @@
+"""
+The `strongarm` command line tool for bulk operations on domains.
+
+Domain names are streamed from the given files (or stdin) and processed by a
+pool of worker threads, so large lists never have to fit in memory.
+
+    $ strongarm create --status blacklisted blacklist.txt
+    $ strongarm list --status whitelisted > whitelist.txt
+    $ strongarm export > domains.jsonl
+
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import urllib3
+
+import strongarm
+from strongarm.common import AdaptiveLimit, _pipeline
+from strongarm.resources import Domain
+
+
+def _read_names(paths, stdin):
+    """
+    Yield the domain names listed one per line in the given files, skipping
+    blank lines and comments. A path of '-' reads stdin.
+
+    """
+    for path in paths or ['-']:
+        if path == '-':
+            lines = stdin
+        else:
+            lines = open(path)
+
+        try:
+            for line in lines:
+                name = line.strip()
+                if name and not name.startswith('#'):
+                    yield name
+        finally:
+            if lines is not stdin:
+                lines.close()
+
+
+class _Progress(object):
+    """
+    Count successes and failures and report the rate to a stream.
+
+    """
+
+    def __init__(self, stream, enabled=False, interval=1.0):
+        self.stream = stream
+        self.enabled = enabled
+        self.interval = interval
+        self.succeeded = 0
+        self.failures = []
+        self.start = self.last_report = time.time()
+
+    @property
+    def done(self):
+        return self.succeeded + len(self.failures)
+
+    def rate(self):
+        elapsed = time.time() - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def update(self, name, error=None):
+        if error is None:
+            self.succeeded += 1
+        else:
+            self.failures.append((name, error))
+
+        now = time.time()
+        if self.enabled and now - self.last_report >= self.interval:
+            self.last_report = now
+            self.stream.write("%d done, %d failed, %.1f/s\n" %
+                              (self.done, len(self.failures), self.rate()))
+            self.stream.flush()
+
+    def summary(self, command):
+        self.stream.write("%s: %d succeeded, %d failed in %.1fs (%.1f/s)\n" %
+                          (command, self.succeeded, len(self.failures),
+                           time.time() - self.start, self.rate()))
+        for name, error in self.failures:
+            self.stream.write("  %s: %s\n" % (name, error))
+
+
+def _json_line(domain):
+    # Nested objects are wrapped in Structs, serialize them as dictionaries.
+    return json.dumps(vars(domain), default=vars) + '\n'
+
+
+def _bulk(args, stdin, stdout, progress):
+    """
+    Run a create, delete or get for every name read from the input.
+
+    """
+    fields = {}
+    if args.status:
+        fields['status'] = args.status
+    if args.description:
+        fields['description'] = args.description
+
+    def create(name):
+        return Domain.create(name=name, **fields)
+
+    def delete(name):
+        return Domain({Domain.id_attr: name}).delete()
+
+    action = {'create': create,
+              'delete': delete,
+              'get': Domain.get}[args.command]
+
+    workers = args.workers
+    if workers is None:
+        # The limiter has to see the errors, which run() swallows.
+        limit = AdaptiveLimit(maximum=args.max_workers)
+        action, workers = limit.wrap(action), limit.maximum
+
+    def run(name):
+        try:
+            return name, action(name), None
+        except Exception as e:
+            return name, None, e
+
+    names = _read_names(args.files, stdin)
+    for name, result, error in _pipeline(run, names, workers, ordered=False):
+        if error is None and args.command == 'get':
+            stdout.write(_json_line(result))
+        progress.update(name, error)
+
+
+def _listing(args, stdout, progress):
+    """
+    Write every domain (optionally of a status) as a name or a JSON line.
+
+    """
+    if args.status:
+        domains = Domain.filter(stream=True, live=True, statuses=args.status)
+    else:
+        domains = Domain.all(stream=True, live=True)
+
+    for domain in domains:
+        if args.command == 'list':
+            stdout.write(domain.name + '\n')
+        else:
+            stdout.write(_json_line(domain))
+        progress.update(domain.name)
+
+
+def _positive(value):
+    """
+    Parse a number of workers, which must be at least one.
+
+    """
+    try:
+        value = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("must be a number")
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
+def _workers(value):
+    """
+    Parse --workers, a number or 'auto' (returned as None).
+
+    """
+    if value == 'auto':
+        return None
+    try:
+        return _positive(value)
+    except argparse.ArgumentTypeError as e:
+        raise argparse.ArgumentTypeError("%s or 'auto'" % e)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='strongarm', description="Bulk operations on strongarm.io domains.")
+    parser.add_argument('--api-key', default=os.environ.get('STRONGARM_API_KEY'),
+                        help="API token (default: $STRONGARM_API_KEY)")
+    parser.add_argument('--host', default=os.environ.get('STRONGARM_HOST'),
+                        help="API host (default: $STRONGARM_HOST or %s)" %
+                        strongarm.host)
+    parser.add_argument('--progress', action='store_true',
+                        help="report progress and rate to stderr")
+
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    for command, summary in [('create', "create the domains named in FILES"),
+                             ('delete', "delete the domains named in FILES"),
+                             ('get', "write the domains named in FILES as "
+                                     "JSON lines")]:
+        sub = commands.add_parser(command, help=summary)
+        sub.add_argument('files', nargs='*', metavar='FILES',
+                         help="files of domain names, one per line "
+                              "(default: stdin)")
+        sub.add_argument('-w', '--workers', type=_workers, default=16,
+                         help="concurrent requests, or 'auto' to adapt to "
+                              "how the API copes (default: 16)")
+        sub.add_argument('--max-workers', type=_positive, default=64,
+                         help="the most concurrent requests with "
+                              "--workers auto (default: 64)")
+        if command == 'create':
+            sub.add_argument('--status', choices=[Domain.BLACKLISTED,
+                                                  Domain.WHITELISTED,
+                                                  Domain.FILTERED])
+            sub.add_argument('--description')
+        else:
+            sub.set_defaults(status=None, description=None)
+
+    for command, summary in [('list', "write domain names"),
+                             ('export', "write domains as JSON lines")]:
+        sub = commands.add_parser(command, help=summary)
+        sub.add_argument('--status', choices=[Domain.BLACKLISTED,
+                                              Domain.WHITELISTED,
+                                              Domain.FILTERED])
+
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Run the command line tool, returning the exit status: 0 on success and 1
+    if any domain failed or the API could not be reached.
+
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("an API key is required, use --api-key or "
+                     "$STRONGARM_API_KEY")
+    # Check the input files now rather than after some of the work is done.
+    for path in getattr(args, 'files', None) or []:
+        if path != '-':
+            try:
+                open(path).close()
+            except EnvironmentError as e:
+                parser.error("can't open '%s': %s" % (path, e.strerror))
+
+    strongarm.api_key = args.api_key
+    if args.host:
+        strongarm.host = args.host
+
+    progress = _Progress(stderr, enabled=args.progress)
+    try:
+        if args.command in ('list', 'export'):
+            _listing(args, stdout, progress)
+        else:
+            _bulk(args, stdin, stdout, progress)
+    except KeyboardInterrupt:
+        stderr.write("Interrupted.\n")
+        progress.failures.append(('-', 'interrupted'))
+    except (strongarm.StrongarmException, EnvironmentError,
+            urllib3.exceptions.HTTPError) as e:
+        progress.failures.append(('-', e))
+    finally:
+        progress.summary(args.command)
+
+    return 1 if progress.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,18 @@
+from array import array
+import codecs
+from collections import OrderedDict, deque
 import json
-
-import requests
-from six import integer_types, iteritems
-from six.moves import xrange
+import re
+import threading
+import time
+import zlib
+
+# The HTTP libraries and other heavy modules are imported where they are first
+# needed to keep `import strongarm` cheap for short-lived processes.
+from six import (binary_type, integer_types, iteritems, string_types,
+                 text_type)
+from six.moves import http_client, queue, xrange
+from six.moves.urllib.parse import urlparse
 
 import strongarm
 
@@ -34,64 +44,1227 @@ class StrongarmUnauthorized(StrongarmHttpError):
     """
 
     def __init__(self, msg):
-        super(StrongarmUnauthorized, self).__init__(requests.codes.unauthorized,
+        super(StrongarmUnauthorized, self).__init__(http_client.UNAUTHORIZED,
                                                     msg)
 
 
-def request(method, endpoint, **kwargs):
+class StrongarmTimeout(StrongarmException):
+    """
+    A request to the strongarm.io API timed out.
+
+    """
+
+
+class StrongarmDeadlineExceeded(StrongarmTimeout):
+    """
+    The deadline for a sequence of requests passed before they completed.
+
+    """
+
+
+class StrongarmCircuitOpen(StrongarmException):
+    """
+    A request was rejected without being sent because the circuit breaker
+    for its host is open.
+
+    """
+
+    def __init__(self, host, retry_after):
+        super(StrongarmCircuitOpen, self).__init__(
+            "Circuit open for %s, retry in %.1fs" % (host, retry_after))
+
+        self.host = host
+        self.retry_after = retry_after
+
+
+# Use a monotonic clock for deadlines where available (Python 3).
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class Deadline(object):
+    """
+    A point in time by which a sequence of requests must complete.
+
+    A deadline can be passed to `request`, to `all` and `filter` (where it
+    applies to every page fetched), or used as a context manager to apply to
+    every request made by the current thread inside the block, including the
+    worker threads of the bulk helpers.
+
+    Once the deadline has passed StrongarmDeadlineExceeded is raised, and
+    request timeouts are capped so that no single request outlives it.
+
+    """
+
+    _local = threading.local()
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = _clock() + seconds
+
+    @classmethod
+    def coerce(cls, deadline):
+        """
+        Return `deadline` as a Deadline, given one or a number of seconds.
+
+        """
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    @classmethod
+    def current(cls):
+        """
+        Return the innermost deadline entered on this thread, if any.
+
+        """
+        stack = getattr(cls._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def remaining(self):
+        """
+        Return the number of seconds left, raising StrongarmDeadlineExceeded
+        if there are none.
+
+        """
+        remaining = self.expires - _clock()
+        if remaining <= 0:
+            raise StrongarmDeadlineExceeded("Deadline of %ss exceeded" %
+                                            self.seconds)
+        return remaining
+
+    def __enter__(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._local.stack.pop()
+
+    def __repr__(self):
+        return "%s(%ss)" % (self.__class__.__name__, self.seconds)
+
+
+class Tenant(object):
+    """
+    The credentials of one account, for making requests on behalf of several
+    accounts from one process.
+
+    Used as a context manager, every request made by the current thread
+    inside the block (including by the worker threads of the bulk helpers and
+    by lists returned inside it, whenever their pages are fetched) uses
+    `api_key` instead of `strongarm.api_key`. `name` identifies the tenant in
+    results and logs, and defaults to the last four characters of the key so
+    that the key itself is never shown.
+
+    """
+
+    _local = threading.local()
+
+    def __init__(self, api_key, name=None):
+        self.api_key = api_key
+        self.name = '...' + api_key[-4:] if name is None else name
+
+    @classmethod
+    def coerce(cls, tenant):
+        """
+        Return `tenant` as a Tenant, given one or an API key.
+
+        """
+        if tenant is None or isinstance(tenant, Tenant):
+            return tenant
+        return cls(tenant)
+
+    @classmethod
+    def current(cls):
+        """
+        Return the innermost tenant entered on this thread, if any.
+
+        """
+        stack = getattr(cls._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def __enter__(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._local.stack.pop()
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, self.name)
+
+
+def _tenant_api_key():
+    """
+    Return the API key of the current thread's tenant, or None outside one.
+
+    """
+    tenant = Tenant.current()
+    return tenant.api_key if tenant is not None else None
+
+
+def _bind_context(fn, deadline=None):
+    """
+    Wrap `fn` to run under `deadline`, by default the current thread's, and
+    the current thread's tenant, for handing work to other threads.
+
+    """
+    for context in (deadline or Deadline.current(), Tenant.current()):
+        if context is not None:
+            fn = _within(context, fn)
+    return fn
+
+
+def _within(context, fn):
+    def bound(*args, **kwargs):
+        with context:
+            return fn(*args, **kwargs)
+
+    return bound
+
+
+def _cap_timeout(timeout, remaining):
+    """
+    Limit a requests style timeout (None, a number or a (connect, read) tuple)
+    to the given number of seconds.
+
+    """
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining)
+                     for t in timeout)
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
+
+
+class Metrics(object):
+    """
+    Thread-safe named counters describing the library's activity.
+
+    The module-level `metrics` instance is updated by `request` and the bulk
+    helpers. Counters that have never been touched read as zero.
+
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__values = {}
+
+    def incr(self, name, amount=1):
+        with self.__lock:
+            self.__values[name] = self.__values.get(name, 0) + amount
+
+    def set(self, name, value):
+        with self.__lock:
+            self.__values[name] = value
+
+    def get(self, name):
+        with self.__lock:
+            return self.__values.get(name, 0)
+
+    def snapshot(self):
+        """
+        Return a copy of all counters as a dictionary.
+
+        """
+        with self.__lock:
+            return dict(self.__values)
+
+    def reset(self):
+        with self.__lock:
+            self.__values.clear()
+
+
+metrics = Metrics()
+
+
+class AdaptiveLimit(object):
+    """
+    A concurrency limit which adapts to how the API copes, for passing as the
+    `workers` of the bulk helpers and of `PaginatedResourceList.map`.
+
+    The limit starts at `initial` and grows by about one for every limit's
+    worth of calls completing at a latency within `tolerance` times the
+    lowest recently seen. It is halved (down to `minimum`) when calls are
+    throttled (HTTP 429 or 503), time out, are rejected by an open circuit
+    breaker, or slow down beyond that, at most once for the calls started
+    after the previous decrease. Other errors leave the limit alone. It never
+    exceeds `maximum`, which is also the number of worker threads used.
+
+    The current limit is published as the `concurrency_limit` metric.
+
+    """
+
+    # Status codes which mean the API is shedding load.
+    throttle_status_codes = (429, 503)
+    # Latency increases of fewer seconds than this are ignored as noise.
+    latency_slack = 0.01
+
+    def __init__(self, initial=4, minimum=1, maximum=64, tolerance=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.__limit = float(max(minimum, min(initial, maximum)))
+        self.__in_flight = 0
+        self.__baseline = None
+        self.__decreased_at = None
+        self.__cond = threading.Condition()
+        metrics.set('concurrency_limit', int(self.__limit))
+
+    @property
+    def limit(self):
+        return int(self.__limit)
+
+    def wrap(self, fn):
+        """
+        Return `fn` wrapped to run within the limit and adjust it.
+
+        """
+        def limited(*args, **kwargs):
+            started = self.__acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except (StrongarmTimeout, StrongarmCircuitOpen):
+                self.__release(started, overloaded=True)
+                raise
+            except StrongarmHttpError as e:
+                self.__release(started, overloaded=e.status_code in
+                               self.throttle_status_codes)
+                raise
+            except BaseException:
+                # Says nothing about the latency of the API.
+                self.__release(started, sample=False)
+                raise
+            self.__release(started)
+            return result
+
+        return limited
+
+    def __acquire(self):
+        with self.__cond:
+            while self.__in_flight >= int(self.__limit):
+                self.__cond.wait()
+            self.__in_flight += 1
+        return _clock()
+
+    def __release(self, started, overloaded=False, sample=True):
+        now = _clock()
+        latency = now - started
+
+        with self.__cond:
+            self.__in_flight -= 1
+            if not sample:
+                self.__cond.notify_all()
+                return
+
+            if not overloaded:
+                if self.__baseline is None or latency < self.__baseline:
+                    self.__baseline = latency
+                else:
+                    # Drift up slowly so the baseline follows lasting changes.
+                    self.__baseline += (latency - self.__baseline) * 0.01
+                overloaded = latency > max(self.tolerance * self.__baseline,
+                                           self.__baseline + self.latency_slack)
+
+            if overloaded:
+                # Calls started before the last decrease reflect the old limit.
+                if self.__decreased_at is None or started > self.__decreased_at:
+                    self.__limit = max(self.minimum, self.__limit / 2)
+                    self.__decreased_at = now
+            else:
+                self.__limit = min(self.maximum,
+                                   self.__limit + 1.0 / self.__limit)
+
+            metrics.set('concurrency_limit', int(self.__limit))
+            self.__cond.notify_all()
+
+    def __repr__(self):
+        return "%s(%d)" % (self.__class__.__name__, self.limit)
+
+
+def _compress(content):
+    """
+    Gzip encode a request body.
+
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(content) + compressor.flush()
+
+
+class _Decompressor(object):
+    """
+    Incrementally decode a response body according to its Content-Encoding
+    header.
+
+    """
+
+    def __init__(self, encoding):
+        self.__encoding = (encoding or 'identity').strip().lower()
+        self.__obj = None
+        self.__started = False
+
+        if self.__encoding in ('gzip', 'x-gzip'):
+            self.__obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.__encoding == 'deflate':
+            self.__obj = zlib.decompressobj()
+        elif self.__encoding != 'identity':
+            raise StrongarmException("Unsupported content encoding: %s" %
+                                     self.__encoding)
+
+    def decompress(self, chunk):
+        if self.__obj is None or not chunk:
+            return chunk
+
+        try:
+            try:
+                return self.__obj.decompress(chunk)
+            except zlib.error:
+                # Servers disagree on whether deflate means a zlib stream or a
+                # raw deflate stream, accept both. The zlib header is checked
+                # on the first chunk so that is the only place to retry.
+                if self.__encoding != 'deflate' or self.__started:
+                    raise
+                self.__obj = zlib.decompressobj(-zlib.MAX_WBITS)
+                return self.__obj.decompress(chunk)
+            finally:
+                self.__started = True
+        except zlib.error as e:
+            raise StrongarmException("Failed to decode %s response: %s" %
+                                     (self.__encoding, e))
+
+    def flush(self):
+        if self.__obj is None:
+            return b''
+        return self.__obj.flush()
+
+
+# The number of bytes read from the network at a time when streaming.
+_STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def _iter_content(res, deadline=None):
+    """
+    Yield the decoded body of a streamed response chunk by chunk, counting the
+    bytes received, and close the response once it has been read.
+
+    """
+    try:
+        decompressor = _Decompressor(res.headers.get('Content-Encoding'))
+        for chunk in res.stream(_STREAM_CHUNK_SIZE):
+            if deadline is not None:
+                deadline.remaining()
+            metrics.incr('bytes_received', len(chunk))
+            chunk = decompressor.decompress(chunk)
+            metrics.incr('bytes_received_decoded', len(chunk))
+            if chunk:
+                yield chunk
+
+        chunk = decompressor.flush()
+        metrics.incr('bytes_received_decoded', len(chunk))
+        if chunk:
+            yield chunk
+    finally:
+        res.close()
+
+
+class Hedging(object):
+    """
+    A policy for hedging GET requests, set as `strongarm.hedging` or passed
+    to `request`.
+
+    If the response to a GET has not started to arrive after the
+    `percentile`th percentile of the latencies of the last `window` requests
+    (but at least `min_delay` seconds), a duplicate request is sent and
+    whichever responds first is used. Nothing is hedged until `min_samples`
+    latencies have been seen, and hedges are limited to a `budget` fraction
+    of the requests made, so they add at most that much load.
+
+    Hedges sent and hedges which responded first are counted as the
+    `hedges_sent` and `hedges_won` metrics.
+
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_delay=0.01,
+                 window=1000, min_samples=20):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.__lock = threading.Lock()
+        self.__latencies = deque(maxlen=window)
+        self.__requests = 0
+        self.__hedges = 0
+
+    def delay(self):
+        """
+        Return the number of seconds to wait before hedging, or None while
+        there are too few latencies to tell.
+
+        """
+        with self.__lock:
+            latencies = sorted(self.__latencies)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        index = min(len(latencies) - 1,
+                    int(len(latencies) * self.percentile / 100.0))
+        return max(self.min_delay, latencies[index])
+
+    def __record(self, latency):
+        with self.__lock:
+            self.__latencies.append(latency)
+
+    def __allow(self, take=True):
+        """
+        Whether the budget allows another hedge, taking it if `take`.
+
+        """
+        with self.__lock:
+            if self.__hedges + 1 > self.budget * self.__requests:
+                return False
+            if take:
+                self.__hedges += 1
+            return True
+
+    def send(self, send, *args, **kwargs):
+        """
+        Call `send(*args, **kwargs)`, hedging it if it is slow, and return the
+        first response. An exception is raised only if every attempt fails.
+
+        """
+        with self.__lock:
+            self.__requests += 1
+
+        delay = self.delay()
+        if delay is None or not self.__allow(take=False):
+            # No hedge is possible, so do not pay for a thread.
+            started = _clock()
+            res = send(*args, **kwargs)
+            self.__record(_clock() - started)
+            return res
+
+        results = queue.Queue()
+        lock = threading.Lock()
+        # Whether a response has been chosen; any later one is closed.
+        done = [False]
+
+        def attempt(hedge):
+            started = _clock()
+            try:
+                res = send(*args, **kwargs)
+            except BaseException as e:
+                # Always report an outcome, or the caller waits forever.
+                results.put((hedge, None, e))
+                return
+            self.__record(_clock() - started)
+
+            with lock:
+                won, done[0] = not done[0], True
+            if won:
+                results.put((hedge, res, None))
+            else:
+                res.close()
+
+        def start(hedge):
+            thread = threading.Thread(target=attempt, args=(hedge,))
+            thread.daemon = True
+            thread.start()
+
+        start(False)
+        attempts = 1
+        try:
+            outcome = results.get(timeout=delay)
+        except queue.Empty:
+            if self.__allow():
+                metrics.incr('hedges_sent')
+                start(True)
+                attempts += 1
+            outcome = results.get()
+
+        error = None
+        while True:
+            hedge, res, e = outcome
+            if e is None:
+                if hedge:
+                    metrics.incr('hedges_won')
+                return res
+            error = error or e
+            attempts -= 1
+            if not attempts:
+                raise error
+            outcome = results.get()
+
+
+class _Circuit(object):
+
+    def __init__(self):
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+
+
+class CircuitBreaker(object):
+    """
+    A per-host circuit breaker for requests, set as
+    `strongarm.circuit_breaker`.
+
+    A request fails if it raises (other than by running out of its own
+    deadline), receives a 5xx response, or takes longer than
+    `slow_threshold` seconds to respond. After `failure_threshold`
+    consecutive failures the circuit for the host opens and requests to it
+    raise StrongarmCircuitOpen immediately. After `reset_timeout` seconds it
+    is half-open: up to `half_open_probes` requests at a time are let through,
+    the first to succeed closes the circuit and a failure opens it again.
+
+    `on_state_change(host, old, new)` is called whenever a circuit changes
+    state; exceptions it raises are ignored. Circuits opened and closed and
+    requests rejected are counted as the `circuits_opened`, `circuits_closed`
+    and `circuit_rejections` metrics.
+
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, slow_threshold=None,
+                 reset_timeout=30, half_open_probes=1, on_state_change=None):
+        self.failure_threshold = failure_threshold
+        self.slow_threshold = slow_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.on_state_change = on_state_change
+        self.__lock = threading.Lock()
+        self.__circuits = {}
+
+    def state(self, host):
+        """
+        Return the state of the circuit for `host`.
+
+        """
+        with self.__lock:
+            circuit = self.__circuits.get(host)
+            return circuit.state if circuit is not None else self.CLOSED
+
+    def wrap(self, host, fn, deadline=None):
+        """
+        Return `fn`, a transport's `send`, wrapped to go through the circuit
+        for `host`. Timeouts after `deadline` has passed are not failures.
+
+        """
+        def guarded(*args, **kwargs):
+            probe = self.__acquire(host)
+            started = _clock()
+            failed = True
+            try:
+                res = fn(*args, **kwargs)
+                failed = (res.status_code >= 500 or
+                          (self.slow_threshold is not None and
+                           _clock() - started > self.slow_threshold))
+                return res
+            except StrongarmTimeout:
+                # Cut short by the caller, which says nothing about the host.
+                if deadline is not None and deadline.expires <= _clock():
+                    failed = None
+                raise
+            finally:
+                self.__release(host, probe, failed)
+
+        return guarded
+
+    def __acquire(self, host):
+        """
+        Admit a request to `host` or raise StrongarmCircuitOpen. Return
+        whether the request is a half-open probe.
+
+        """
+        with self.__lock:
+            circuit = self.__circuits.setdefault(host, _Circuit())
+            changed = None
+
+            if circuit.state == self.OPEN:
+                wait = circuit.opened_at + self.reset_timeout - _clock()
+                if wait > 0:
+                    metrics.incr('circuit_rejections')
+                    raise StrongarmCircuitOpen(host, wait)
+                changed = self.__change(circuit, self.HALF_OPEN)
+
+            probe = circuit.state == self.HALF_OPEN
+            if probe:
+                if circuit.probes >= self.half_open_probes:
+                    metrics.incr('circuit_rejections')
+                    raise StrongarmCircuitOpen(host, 0)
+                circuit.probes += 1
+
+        self.__notify(host, changed)
+        return probe
+
+    def __release(self, host, probe, failed):
+        """
+        Record the outcome of a request; `failed` is None if it tells nothing.
+
+        """
+        with self.__lock:
+            circuit = self.__circuits[host]
+            changed = None
+            if probe:
+                circuit.probes -= 1
+
+            if failed:
+                circuit.failures += 1
+                if ((probe and circuit.state == self.HALF_OPEN) or
+                        (circuit.state == self.CLOSED and
+                         circuit.failures >= self.failure_threshold)):
+                    circuit.opened_at = _clock()
+                    changed = self.__change(circuit, self.OPEN)
+            elif failed is not None:
+                circuit.failures = 0
+                if probe and circuit.state == self.HALF_OPEN:
+                    changed = self.__change(circuit, self.CLOSED)
+
+        self.__notify(host, changed)
+
+    def __change(self, circuit, state):
+        old, circuit.state = circuit.state, state
+        if state == self.OPEN:
+            metrics.incr('circuits_opened')
+        elif state == self.CLOSED:
+            metrics.incr('circuits_closed')
+        return (old, state)
+
+    def __notify(self, host, changed):
+        if changed is None or self.on_state_change is None:
+            return
+        try:
+            self.on_state_change(host, *changed)
+        except Exception:
+            pass
+
+
+_default_transport = None
+
+
+def _get_transport():
     """
-    Wrap requests.request to help make HTTP requests to the API.
+    Return `strongarm.transport`, or a shared RequestsTransport by default.
+
+    """
+    global _default_transport
+
+    if strongarm.transport is not None:
+        return strongarm.transport
+    if _default_transport is None:
+        from strongarm.transports import RequestsTransport
+        _default_transport = RequestsTransport()
+    return _default_transport
+
+
+def request(method, endpoint, compress=None, stream=False, api_key=None,
+            deadline=None, transport=None, hedging=None, **kwargs):
+    """
+    Help make HTTP requests to the API through a transport.
 
     Add authentication to request and do error checking on response.
 
+    The request is sent with `transport`, by default `strongarm.transport` or
+    a shared RequestsTransport. See `strongarm.transports`.
+
+    Response compression is negotiated when `strongarm.compression` is set and
+    decoded here. A request body is gzip encoded when `compress` is True, or
+    when it is None and the body is at least
+    `strongarm.request_compression_threshold` bytes. The bytes sent and
+    received on the wire are counted in `metrics`.
+
+    With `stream` a successful response is not parsed, instead an iterator
+    over the decoded chunks of the body is returned as they arrive.
+
+    `api_key` overrides the key of the current thread's Tenant, if any, and
+    otherwise `strongarm.api_key` for this request.
+
+    `timeout` defaults to `strongarm.timeout` and is capped by `deadline` (a
+    Deadline or a number of seconds), which defaults to the deadline entered
+    on the current thread. StrongarmTimeout is raised if the request times
+    out and StrongarmDeadlineExceeded if the deadline has passed.
+
+    GET requests are hedged according to `hedging`, a Hedging policy which
+    defaults to `strongarm.hedging` (False disables it).
+
+    If `strongarm.circuit_breaker` is set, StrongarmCircuitOpen is raised
+    without sending the request while the circuit for its host is open.
+
     """
 
     if 'headers' not in kwargs:
         kwargs['headers'] = {}
 
     # Add authorization token to the request headers.
-    kwargs['headers']['Authorization'] = 'Token %s' % strongarm.api_key
+    kwargs['headers']['Authorization'] = 'Token %s' % (
+        api_key or _tenant_api_key() or strongarm.api_key)
 
     # Explicitly specify the API version for future-proofing.
     kwargs['headers']['Accept'] = ('application/json; version=%s' %
                                    strongarm.api_version)
 
-    # Don't allow requests to follow redirects, it is generally bad practice to
-    # allow an API library to follow any redirects.
-    kwargs['allow_redirects'] = False
+    # Negotiate compression explicitly instead of relying on the defaults of
+    # the HTTP library, since the body is decoded below.
+    kwargs['headers']['Accept-Encoding'] = ('gzip, deflate'
+                                            if strongarm.compression
+                                            else 'identity')
+
+    data = kwargs.get('data')
+    if isinstance(data, (text_type, binary_type)):
+        if isinstance(data, text_type):
+            data = data.encode('utf-8')
+        metrics.incr('bytes_sent_uncompressed', len(data))
+
+        if compress is None:
+            threshold = strongarm.request_compression_threshold
+            compress = threshold is not None and len(data) >= threshold
+        if compress:
+            data = _compress(data)
+            kwargs['headers']['Content-Encoding'] = 'gzip'
+
+        metrics.incr('bytes_sent', len(data))
+        kwargs['data'] = data
 
     # This should only be used for development, never in a production
     # environment.
     if strongarm._ignore_certificates is True:
        kwargs['verify'] = False
 
-    res = requests.request(method, endpoint, **kwargs)
+    # Never wait forever on a stuck connection.
+    kwargs.setdefault('timeout', strongarm.timeout)
+    deadline = Deadline.coerce(deadline) or Deadline.current()
+    if deadline is not None:
+        kwargs['timeout'] = _cap_timeout(kwargs['timeout'], deadline.remaining())
+
+    # Transports never follow redirects and return the raw body, so the bytes
+    # on the wire can be measured.
+    send = (transport or _get_transport()).send
+    if strongarm.circuit_breaker is not None:
+        send = strongarm.circuit_breaker.wrap(urlparse(endpoint).netloc, send,
+                                              deadline)
+    if hedging is None:
+        hedging = strongarm.hedging
+    try:
+        if hedging and method.lower() == 'get':
+            res = hedging.send(send, method, endpoint, **kwargs)
+        else:
+            res = send(method, endpoint, **kwargs)
+    except StrongarmTimeout:
+        if deadline is not None:
+            deadline.remaining()
+        raise
+    metrics.incr('requests')
+
+    chunks = _iter_content(res, deadline)
+    if stream and res.status_code < 400:
+        return chunks
+
+    content = b''.join(chunks)
+    text = content.decode(res.encoding or 'utf-8', 'replace')
 
     # Raise StrongarmUnauthorized for HTTP 401 Unauthorized.
-    if res.status_code == requests.codes.unauthorized:
+    if res.status_code == http_client.UNAUTHORIZED:
         try:
-            msg = res.json()['detail']
+            msg = json.loads(text)['detail']
         except (ValueError, KeyError):
-            msg = res.text
+            msg = text
         raise StrongarmUnauthorized(msg)
 
     # Raise StrongarmException for HTTP error codes.
     elif res.status_code >= 400:
         try:
-            msg = res.json()['detail']
+            msg = json.loads(text)['detail']
         except (ValueError, KeyError, TypeError):
-            msg = res.text
+            msg = text
         raise StrongarmHttpError(res.status_code, msg)
 
     # If the content is empty, do not parse json and return None directly.
-    if not res.text:
+    if not text:
         return None
 
     try:
-        return res.json()
+        return json.loads(text)
     # If the content is not json, raise StrongarmException.
     except ValueError:
-        raise StrongarmException("Failed to parse response: %s" % res.text)
+        raise StrongarmException("Failed to parse response: %s" % text)
+
+
+def _run_bounded(fn, items, workers=1, deadline=None):
+    """
+    Call `fn` on each item with at most `workers` calls in flight, under
+    `deadline` (by default the current thread's).
+
+    `workers` may also be an AdaptiveLimit.
+
+    Return a list of (item, result, error) tuples in the order of `items`. An
+    exception raised by `fn` is captured in `error` (with `result` set to None)
+    so one failure does not abort the remaining calls.
+
+    """
+
+    fn = _bind_context(fn, deadline)
+    if isinstance(workers, AdaptiveLimit):
+        fn, workers = workers.wrap(fn), workers.maximum
+
+    def call(item):
+        try:
+            return (item, fn(item), None)
+        except Exception as e:
+            return (item, None, e)
+
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    from multiprocessing.pool import ThreadPool
+
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(call, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def fan_out(fn, tenants, workers=8, deadline=None):
+    """
+    Call `fn(tenant)` for every tenant with at most `workers` calls in flight,
+    each inside its Tenant so that every request it makes uses that tenant's
+    credentials.
+
+    `tenants` are Tenants or API keys. (tenant, result, error) tuples are
+    yielded as the calls complete; an exception raised for one tenant is
+    captured in `error` (with `result` set to None) and does not affect the
+    others. `deadline` (by default the current thread's) bounds every call.
+
+    Lists are fetched lazily, so `fn` should consume them, e.g.
+    `lambda tenant: list(Domain.all())`, for the pages to be fetched
+    concurrently.
+
+    """
+    def call(tenant):
+        try:
+            with tenant:
+                return (tenant, fn(tenant), None)
+        except Exception as e:
+            return (tenant, None, e)
+
+    # The workers otherwise inherit the current thread's deadline.
+    deadline = Deadline.coerce(deadline)
+    if deadline is not None:
+        call = _within(deadline, call)
+
+    tenants = (Tenant.coerce(tenant) for tenant in tenants)
+    return _pipeline(call, tenants, workers, ordered=False)
+
+
+def _check_workers(workers):
+    """
+    Raise ValueError unless `workers` is at least one or an AdaptiveLimit.
+
+    """
+    if isinstance(workers, AdaptiveLimit):
+        workers = workers.maximum
+    if workers < 1:
+        raise ValueError("workers must be at least 1, not %r" % (workers,))
+
+
+def _pipeline(fn, iterable, workers, ordered=True, buffer=None):
+    """
+    Yield `fn(item)` for each item of `iterable`, calling `fn` on `workers`
+    threads while another thread consumes `iterable`.
+
+    At most `buffer` items (by default twice the number of workers) are taken
+    from `iterable` before their results have been yielded, so memory stays
+    bounded however slow the consumer is. Results are yielded in the order of
+    `iterable` if `ordered` and as soon as they are ready otherwise.
+
+    An exception raised by `fn` or while iterating is re-raised here (in its
+    place in the sequence if `ordered`) and the remaining work is abandoned.
+
+    With an AdaptiveLimit as `workers`, at most its current limit of calls
+    run at once on its maximum number of threads.
+
+    """
+    if isinstance(workers, AdaptiveLimit):
+        fn, workers = workers.wrap(fn), workers.maximum
+    _check_workers(workers)
+    buffer = buffer or 2 * workers
+    tasks = queue.Queue()
+    results = queue.Queue()
+    stop = threading.Event()
+    slots = threading.Condition()
+    # A list so that the nested functions can modify it on Python 2.
+    in_flight = [0]
+    end = object()
+
+    def feed():
+        index = 0
+        items = iter(iterable)
+        try:
+            while True:
+                # Wait for a free slot before taking the next item, which may
+                # mean fetching another page.
+                with slots:
+                    while in_flight[0] >= buffer and not stop.is_set():
+                        slots.wait()
+                    if stop.is_set():
+                        return
+                    in_flight[0] += 1
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                tasks.put((index, item))
+                index += 1
+            results.put((index, end, None))
+        except Exception as e:
+            results.put((index, None, e))
+        finally:
+            for _ in xrange(workers):
+                tasks.put(None)
+
+    def work():
+        while True:
+            task = tasks.get()
+            if task is None or stop.is_set():
+                return
+            index, item = task
+            try:
+                results.put((index, fn(item), None))
+            except Exception as e:
+                results.put((index, None, e))
+
+    threads = [threading.Thread(target=_bind_context(feed))]
+    threads.extend(threading.Thread(target=_bind_context(work))
+                   for _ in xrange(workers))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    def release():
+        with slots:
+            in_flight[0] -= 1
+            slots.notify()
+
+    try:
+        pending = {}
+        next_index = 0
+        total = None
+        while total is None or next_index < total:
+            index, result, error = results.get()
+
+            if not ordered:
+                if error is not None:
+                    raise error
+                if result is end:
+                    total = index
+                    continue
+                release()
+                next_index += 1
+                yield result
+                continue
+
+            pending[index] = (result, error)
+            while next_index in pending:
+                result, error = pending.pop(next_index)
+                if error is not None:
+                    raise error
+                if result is end:
+                    total = next_index
+                    break
+                release()
+                next_index += 1
+                yield result
+    finally:
+        stop.set()
+        with slots:
+            slots.notify_all()
+
+
+class _JsonReader(object):
+    """
+    Incrementally read JSON tokens and values from an iterable of byte chunks.
+
+    """
+
+    _whitespace = re.compile(r'[ \t\n\r]*')
+    # Characters which may follow a complete value.
+    _delimiters = frozenset(u' \t\n\r,]}:')
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, chunks):
+        self.__chunks = iter(chunks)
+        self.__decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__buffer = u''
+        self.__pos = 0
+        self.__eof = False
+
+    def __fill(self):
+        """
+        Read another chunk into the buffer, return False at the end of the
+        stream.
+
+        """
+        if self.__eof:
+            return False
+
+        try:
+            chunk = self.__decoder.decode(next(self.__chunks))
+        except StopIteration:
+            chunk = self.__decoder.decode(b'', True)
+            self.__eof = True
+
+        # Drop the text which has already been consumed.
+        self.__buffer = self.__buffer[self.__pos:] + chunk
+        self.__pos = 0
+        return True
+
+    def peek(self):
+        """
+        Return the next non-whitespace character without consuming it.
+
+        """
+        while True:
+            self.__pos = self._whitespace.match(self.__buffer, self.__pos).end()
+            if self.__pos < len(self.__buffer):
+                return self.__buffer[self.__pos]
+            if not self.__fill():
+                raise StrongarmException("Failed to parse response: "
+                                         "unexpected end of data")
+
+    def expect(self, *chars):
+        """
+        Consume and return the next character, which must be one of `chars`.
+
+        """
+        char = self.peek()
+        if char not in chars:
+            raise StrongarmException("Failed to parse response: expected %s "
+                                     "but found %r" % (' or '.join(chars), char))
+        self.__pos += 1
+        return char
+
+    def value(self):
+        """
+        Consume and return the next complete JSON value.
+
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.__buffer, self.__pos)
+                # A value which is not followed by a delimiter may be
+                # truncated, e.g. a number, so only trust it when one follows.
+                if (self.__eof or (end < len(self.__buffer) and
+                                   self.__buffer[end] in self._delimiters)):
+                    self.__pos = end
+                    return value
+            except ValueError as e:
+                if self.__eof:
+                    raise StrongarmException("Failed to parse response: %s" % e)
+            self.__fill()
+
+
+def _iter_page(chunks):
+    """
+    Incrementally parse a page of results from an iterable of byte chunks.
+
+    Yield a (key, value) pair for each top-level key of the page, except that
+    each element of the `results` array is yielded as ('results', element) as
+    soon as it has been received.
+
+    """
+    reader = _JsonReader(chunks)
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(':')
+
+        if key == 'results' and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(',', ']') == ']':
+                        break
+        else:
+            yield key, reader.value()
+
+        if reader.expect(',', '}') == '}':
+            return
+
+
+def _flatten(element, into, prefix=''):
+    """
+    Copy the values of a decoded JSON object (or a Struct) into `into`,
+    naming the values of nested objects by their path, e.g. `location.city`.
+
+    """
+    if isinstance(element, Struct):
+        element = vars(element)
+
+    for key, value in iteritems(element):
+        if isinstance(value, (dict, Struct)):
+            _flatten(value, into, prefix + key + '.')
+        else:
+            into[prefix + key] = value
+    return into
+
+
+# Python 2 has no 'q' typecode, its 'l' is 64 bits on most platforms.
+try:
+    _INTEGER_TYPECODE = array('q').typecode
+except ValueError:
+    _INTEGER_TYPECODE = 'l'
+
+
+class _Column(object):
+    """
+    The values of one column, kept in a typed array while they are all
+    integers (or all numbers) and in a list otherwise. Missing numbers are
+    stored as NaN.
+
+    """
+
+    def __init__(self):
+        self.values = array(_INTEGER_TYPECODE)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __to_list(self):
+        # Missing values go back to None.
+        self.values = [None if v != v else v for v in self.values]
+
+    def append(self, value):
+        if isinstance(self.values, array):
+            if value is None:
+                value = float('nan')
+            if (isinstance(value, bool) or
+                    not isinstance(value, integer_types + (float,))):
+                self.__to_list()
+            elif (self.values.typecode == _INTEGER_TYPECODE and
+                  isinstance(value, float)):
+                self.values = array('d', self.values)
+
+        try:
+            self.values.append(value)
+        except OverflowError:
+            # Too large for the integer array.
+            self.__to_list()
+            self.values.append(value)
 
 
 class PaginatedResourceList(object):
@@ -107,52 +1280,176 @@ class PaginatedResourceList(object):
     Provide a custom iterator that loops over all elements, transparently
     fetching additional pages when needed. Indexing and slicing work similarly.
 
+    With `stream` each page is parsed incrementally as it is received and
+    elements become available one by one, instead of after the whole page has
+    been downloaded and decoded. Only the first few bytes of the first page
+    are read on initialization.
+
+    The pages can be split into picklable PageRange shards with `shards` to be
+    fetched and processed independently by worker processes.
+
+    A `deadline` (a Deadline or a number of seconds from now) applies to every
+    page fetched, however the list is accessed.
+
+    `pages` yields the elements page by page together with a checkpoint, a
+    JSON-serializable dict recording how far the listing has got. A list
+    created with a `checkpoint` resumes after that page instead of starting
+    over: it holds only the elements that follow it, although `len()` still
+    reports the total.
+
+    `to_arrays` and `to_frame` load the remaining elements as columns instead
+    of resource objects.
+
     """
 
-    def __init__(self, content_cls, first_url, params=None):
+    # The query parameter selecting a page number.
+    page_param = 'page'
+
+    @classmethod
+    def _from_elements(cls, content_cls, elements):
+        """
+        Build a fully populated list from elements already in memory.
+
+        """
+        self = cls.__new__(cls)
+        self.__content_cls = content_cls
+        self.__data = list(elements)
+        self.__len = len(self.__data)
+        self.__offset = 0
+        self.__page_ends = [(self.__len, None)]
+        self.__first_url = self.__next_url = None
+        self.__params = None
+        self.__page_size = self.__len
+        self.__stream = False
+        self.__deadline = None
+        self.__api_key = None
+        self.__page = None
+        return self
+
+    def __init__(self, content_cls, first_url, params=None, stream=False,
+                 deadline=None, checkpoint=None):
         self.__content_cls = content_cls
         self.__data = []
         self.__len = None
+        # The number of elements before the first one held, when resuming.
+        self.__offset = 0
+        # The end of every page read so far and the URL of the page after it.
+        self.__page_ends = []
+        self.__first_url = first_url
+        self.__params = params
+        self.__page_size = None
         self.__next_url = first_url
+        self.__stream = stream
+        self.__deadline = Deadline.coerce(deadline)
+        # Later pages are fetched for the tenant the list was created for.
+        self.__api_key = _tenant_api_key()
+        # The key/value pairs of the page currently being read.
+        self.__page = None
+
+        if checkpoint is not None:
+            self.__next_url = checkpoint['next']
+            self.__offset = checkpoint['offset']
+            self.__len = checkpoint['count']
+            # The URL of the next page already includes any parameters.
+            params = None
+            if self.__next_url is None:
+                return
+
         # The first time we expand we can pass in additional parameters (e.g.
         # for filtering).
-        self.__expand(params=params)
-
-    def __can_expand(self):
+        self.__fetch(params=params)
+
+        # Read the first page until the total number of elements is known.
+        while self.__len is None:
+            if not self.__read():
+                raise StrongarmException("Failed to parse response: "
+                                         "missing count")
+        if not stream:
+            while self.__read():
+                pass
+
+    def __fetch(self, **kwargs):
         """
-        Whether or not there are additional pages of data to fetch.
+        Start reading the next page of data.
 
         """
-        return len(self.__data) < self.__len
-
-    def __expand(self, **kwargs):
+        url, self.__next_url = self.__next_url, None
+
+        if self.__stream:
+            self.__page = _iter_page(request('get', url, stream=True,
+                                             deadline=self.__deadline,
+                                             api_key=self.__api_key, **kwargs))
+        else:
+            data = request('get', url, deadline=self.__deadline,
+                           api_key=self.__api_key, **kwargs)
+            page = [('count', data['count']), ('next', data.get('next'))]
+            page.extend(('results', element) for element in data['results'])
+            self.__page = iter(page)
+
+    def __read(self, sink=None):
         """
-        Expand the internal list by fetching an additional page of data.
+        Process the next key/value pair of the current page. Return False once
+        the page has been fully read.
+
+        Elements are passed to `sink` as decoded JSON if it is given, instead
+        of being added to the list.
 
         """
-        data = request('get', self.__next_url, **kwargs)
+        try:
+            key, value = next(self.__page)
+        except StopIteration:
+            self.__page = None
+            self.__page_ends.append((len(self.__data), self.__next_url))
+            if self.__page_size is None:
+                self.__page_size = len(self.__data)
+            return False
+
+        if key == 'results':
+            if sink is not None:
+                sink(value)
+            else:
+                self.__data.append(self.__content_cls(value))
+        elif key == 'count':
+            if self.__len is None:
+                self.__len = value
+        elif key == 'next':
+            self.__next_url = value
+
+        return True
+
+    def __expand(self):
+        """
+        Expand the internal list by at least one element, fetching an
+        additional page of data if needed. Return False if there is no more
+        data.
 
-        if self.__len is None:
-            self.__len = data['count']
+        """
+        size = len(self.__data)
+        while len(self.__data) == size:
+            if self.__page is None:
+                if not self.__more():
+                    return False
+                self.__fetch()
+            self.__read()
 
-        self.__next_url = data.get('next')
+        return True
 
-        new_data = [self.__content_cls(element) for element in data['results']]
-        self.__data += new_data
+    def __more(self):
+        """
+        Whether there is another page to fetch.
 
-        return new_data
+        """
+        return (self.__next_url is not None and
+                self.__offset + len(self.__data) < self.__len)
 
     def __len__(self):
         return self.__len
 
     def __iter__(self):
-        for element in self.__data:
-            yield element
-
-        while self.__can_expand():
-            new_data = self.__expand()
-            for element in new_data:
-                yield element
+        index = 0
+        while index < len(self.__data) or self.__expand():
+            yield self.__data[index]
+            index += 1
 
     def __getitem__(self, index):
 
@@ -163,8 +1460,13 @@ class PaginatedResourceList(object):
             if not (0 <= index < self.__len):
                 raise IndexError("list index out of range")
 
+            index -= self.__offset
+            if index < 0:
+                raise IndexError("list index before the checkpoint")
+
             while index >= len(self.__data):
-                self.__expand()
+                if not self.__expand():
+                    raise IndexError("list index out of range")
 
             return self.__data[index]
 
@@ -177,9 +1479,238 @@ class PaginatedResourceList(object):
 
         raise TypeError("list indices must be integers, not %s" % type(index))
 
-    def count():
+    def count(self):
         return self.__len
 
+    def pages(self):
+        """
+        Yield the elements of each page as a list, together with the
+        checkpoint to resume from once that page has been processed.
+
+        """
+        page = 0
+        start = 0
+        while True:
+            while page >= len(self.__page_ends):
+                if self.__page is None:
+                    if not self.__more():
+                        return
+                    self.__fetch()
+                self.__read()
+
+            end, next_url = self.__page_ends[page]
+            checkpoint = {'next': next_url, 'offset': self.__offset + end,
+                          'count': self.__len}
+            yield self.__data[start:end], checkpoint
+            page += 1
+            start = end
+
+    def to_arrays(self, columns=None):
+        """
+        Return the elements as an ordered dict of columns, each an
+        `array.array` of integers or floats if every value is a number and a
+        list otherwise.
+
+        Nested objects are flattened into columns named by their path, e.g.
+        `location.city`. Only the named `columns` are built if given, in that
+        order; otherwise every column, in the order first seen. Values missing
+        from an element are None, or NaN in numeric columns.
+
+        Pages not yet read are decoded straight into the columns without
+        creating resource objects. They are not kept, so the list cannot be
+        iterated any further afterwards.
+
+        """
+        result = OrderedDict()
+        if columns is not None:
+            for name in columns:
+                result[name] = _Column()
+        rows = [0]
+
+        def add(element):
+            for name, value in iteritems(_flatten(element, {})):
+                column = result.get(name)
+                if column is None:
+                    if columns is not None:
+                        continue
+                    column = result[name] = _Column()
+                for _ in xrange(rows[0] - len(column)):
+                    column.append(None)
+                column.append(value)
+            rows[0] += 1
+
+        for element in self.__data:
+            add(element)
+        while True:
+            if self.__page is None:
+                if self.__next_url is None:
+                    break
+                self.__fetch()
+            self.__read(add)
+
+        for name, column in iteritems(result):
+            for _ in xrange(rows[0] - len(column)):
+                column.append(None)
+            result[name] = column.values
+        return result
+
+    def to_frame(self, columns=None):
+        """
+        Return the elements as a pandas DataFrame, built from `to_arrays`.
+
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError("to_frame requires pandas")
+
+        arrays = self.to_arrays(columns)
+        return pandas.DataFrame(arrays, columns=list(arrays))
+
+    def map(self, fn, workers=4, ordered=True, buffer=None):
+        """
+        Yield `fn(element)` for every element, calling `fn` on `workers`
+        threads while further pages are fetched in the background.
+
+        Results are yielded in list order if `ordered` and as soon as they are
+        ready otherwise. At most `buffer` elements (by default twice the number
+        of workers) are fetched ahead of the results consumed, so memory stays
+        bounded. The first exception raised by `fn` or by a page fetch is
+        re-raised and the remaining work is abandoned.
+
+        `workers` may be an AdaptiveLimit to find the concurrency the API
+        copes with instead.
+
+        """
+        _check_workers(workers)
+        return _pipeline(fn, self, workers, ordered=ordered, buffer=buffer)
+
+    def for_each(self, fn, workers=4, buffer=None):
+        """
+        Call `fn` on every element like `map`, discarding the results.
+
+        """
+        for _ in self.map(fn, workers, ordered=False, buffer=buffer):
+            pass
+
+    def shards(self, count=None, pages_per_shard=None):
+        """
+        Split the pages of this list into PageRange shards.
+
+        Either `count` shards of (nearly) equal size or shards of
+        `pages_per_shard` pages are returned, in page order. Each shard can be
+        pickled and sent to another process, where iterating over it fetches
+        only its own pages. The credentials in use now are carried along.
+
+        A list held in memory, e.g. one answered by a snapshot, has no pages
+        to fetch and is split into lists of its elements instead. A list
+        resumed from a checkpoint cannot be sharded, since the pages before
+        the checkpoint would be fetched again; StrongarmException is raised.
+
+        """
+        if (count is None) == (pages_per_shard is None):
+            raise ValueError("Exactly one of count and pages_per_shard must "
+                             "be given")
+        if self.__offset:
+            raise StrongarmException("A list resumed from a checkpoint cannot "
+                                     "be sharded")
+
+        # The page size is only known once the first page has been read.
+        while self.__page is not None and self.__page_size is None:
+            self.__read()
+        if not self.__len:
+            return []
+
+        page_size = self.__page_size or self.__len
+        pages = (self.__len + page_size - 1) // page_size
+
+        if pages_per_shard is None:
+            pages_per_shard = (pages + count - 1) // count
+
+        if self.__first_url is None:
+            if count is not None:
+                size = (self.__len + count - 1) // count
+            else:
+                size = pages_per_shard * page_size
+            return [self.__data[start:start + size]
+                    for start in xrange(0, self.__len, size)]
+
+        return [PageRange(self.__content_cls, self.__first_url, self.__params,
+                          start, min(start + pages_per_shard, pages + 1),
+                          page_param=self.page_param,
+                          api_key=self.__api_key or strongarm.api_key)
+                for start in xrange(1, pages + 1, pages_per_shard)]
+
+    def map_shards(self, fn, pool, count=None, ordered=True):
+        """
+        Call `fn` on every element using the worker processes of `pool`.
+
+        The list is split into `count` shards (by default one per worker) and
+        each worker fetches and processes only the pages of its shards. The
+        results are yielded as shards complete, in list order if `ordered`.
+        `fn` must be picklable, i.e. defined at the top level of a module.
+
+        """
+        if count is None:
+            count = getattr(pool, '_processes', None) or 1
+
+        task = _MapShard(fn)
+        shards = self.shards(count)
+        results = (pool.imap(task, shards) if ordered
+                   else pool.imap_unordered(task, shards))
+
+        for shard_results in results:
+            for result in shard_results:
+                yield result
+
+
+class PageRange(object):
+    """
+    A picklable range of pages of a paginated list, from page number `start`
+    up to but not including `stop`.
+
+    Iterating fetches each page in the range in turn and yields its elements.
+
+    """
+
+    def __init__(self, content_cls, url, params, start, stop,
+                 page_param='page', api_key=None):
+        self.content_cls = content_cls
+        self.url = url
+        self.params = params
+        self.start = start
+        self.stop = stop
+        self.page_param = page_param
+        self.api_key = api_key
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        for page in xrange(self.start, self.stop):
+            params = dict(self.params or {})
+            params[self.page_param] = page
+            data = request('get', self.url, params=params, api_key=self.api_key)
+            for element in data['results']:
+                yield self.content_cls(element)
+
+    def __repr__(self):
+        return "%s(%s, pages %d-%d)" % (self.__class__.__name__, self.url,
+                                        self.start, self.stop - 1)
+
+
+class _MapShard(object):
+    """
+    A picklable callable applying a function to every element of a shard.
+
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, shard):
+        return [self.fn(element) for element in shard]
+
 
 class Struct(object):
     """
@@ -199,6 +1730,141 @@ class Struct(object):
         return "%s(%s)" % (self.__class__.__name__, self.__dict__)
 
 
+class Snapshot(object):
+    """
+    An in-memory copy of every instance of a listable resource, indexed for
+    answering `get`, `filter` and `all` without calling the API.
+
+    `refresh` loads the whole list and swaps it in atomically. `start` loads it
+    once and then refreshes it every `interval` seconds on a background
+    thread. The snapshot is fresh while it is at most `max_age` seconds old (by
+    default twice the interval); callers should fall back to the API when it is
+    not.
+
+    Besides the unique identifier, instances are indexed by the attributes
+    named in the resource's `filter_fields`, which maps filter names to
+    attribute names.
+
+    The instances returned are shared by every caller and should not be
+    modified. Changes made since the last refresh are not reflected.
+
+    """
+
+    def __init__(self, resource_cls, interval=300, max_age=None):
+        self.resource_cls = resource_cls
+        self.interval = interval
+        self.max_age = 2 * interval if max_age is None else max_age
+        # A (loaded_at, elements, by_id, indexes) tuple, replaced as a whole.
+        self.__state = None
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def refresh(self):
+        """
+        Fetch every instance from the API and replace the snapshot.
+
+        """
+        cls = self.resource_cls
+        id_attr = cls.id_attr or 'id'
+        fields = getattr(cls, 'filter_fields', None) or {}
+
+        elements = list(PaginatedResourceList(cls, strongarm.host + cls.endpoint))
+        by_id = {}
+        indexes = dict((name, {}) for name in fields)
+        for element in elements:
+            by_id[str(getattr(element, id_attr))] = element
+            for name, attr in iteritems(fields):
+                value = getattr(element, attr, None)
+                indexes[name].setdefault(value, []).append(element)
+
+        self.__state = (_clock(), elements, by_id, indexes)
+        metrics.incr('snapshot_refreshes')
+
+    @property
+    def fresh(self):
+        # The snapshot holds what strongarm.api_key can see, so it never
+        # answers for a tenant.
+        if Tenant.current() is not None:
+            return False
+        state = self.__state
+        return state is not None and _clock() - state[0] <= self.max_age
+
+    def can_filter(self, **kwargs):
+        """
+        Whether the given filters can be answered from the indexes.
+
+        """
+        fields = getattr(self.resource_cls, 'filter_fields', None) or {}
+        return set(kwargs).issubset(fields)
+
+    def get(self, id):
+        """
+        Return the instance with the given identifier, raising KeyError if it
+        is not in the snapshot, e.g. because it was created since.
+
+        """
+        return self.__state[2][str(id)]
+
+    def all(self):
+        return PaginatedResourceList._from_elements(self.resource_cls,
+                                                    self.__state[1])
+
+    def filter(self, **kwargs):
+        """
+        Return a PaginatedResourceList of the instances matching every filter.
+
+        A filter value may be a single value, a comma separated string, or a
+        list of values, any of which may match.
+
+        """
+        elements, indexes = self.__state[1], self.__state[3]
+
+        matches = None
+        for name, values in iteritems(kwargs):
+            if isinstance(values, string_types):
+                values = values.split(',')
+            elif not isinstance(values, (list, tuple, set, frozenset)):
+                values = [values]
+            found = set()
+            for value in values:
+                found.update(id(e) for e in indexes[name].get(value, ()))
+            matches = found if matches is None else matches & found
+
+        if matches is not None:
+            elements = [e for e in elements if id(e) in matches]
+        return PaginatedResourceList._from_elements(self.resource_cls, elements)
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the old snapshot until it goes stale.
+                metrics.incr('snapshot_refresh_errors')
+
+    def start(self):
+        """
+        Load the snapshot and keep refreshing it in the background.
+
+        """
+        self.refresh()
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop refreshing the snapshot in the background.
+
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+
 class StrongResource(Struct):
     """
     The abstract base class for a piece of a resource.
@@ -213,6 +1879,14 @@ class StrongResource(Struct):
 
     @classmethod
     def get(cls, id):
+        snapshot = getattr(cls, 'snapshot', None)
+        if snapshot is not None and snapshot.fresh:
+            # Instances missing from the snapshot may have been created since.
+            try:
+                return snapshot.get(id)
+            except KeyError:
+                pass
+
         endpoint = strongarm.host + cls.endpoint + str(id)
         if not endpoint.endswith('/'):
             endpoint = endpoint + '/'
@@ -224,32 +1898,148 @@ class ListableResource(object):
     A mixin for a resource that can be listed.
 
     The `all` method returns an instance of PaginatedResourceList that lazily
-    contains all instances of the requested resource.
+    contains all instances of the requested resource. Pass `stream=True` to
+    parse pages incrementally as they are received, and a `deadline` to bound
+    the time taken to fetch every page.
+
+    The `count`, `exists` and `first` methods answer their question with a
+    request for a single element, without downloading a full page. They take
+    the same filters as `filter` on a FilterableResource.
+
+    `enable_snapshot` opts in to answering `get`, `all`, `filter`, `count`,
+    `exists` and `first` from an in-memory Snapshot refreshed in the
+    background, falling back to the API whenever the snapshot is stale (and
+    for `get`, when the instance is not in it). The snapshot is not updated
+    by `create` or `delete`, so reads may not reflect the caller's own writes
+    until the next refresh; pass `live=True` to `all` and `filter` to always
+    read from the API.
 
     """
     id_attr = None
+    snapshot = None
+    filterable_attrs = None
+    # The query parameter setting the number of elements per page.
+    page_size_param = 'page_size'
+
+    @classmethod
+    def _check_filters(cls, filters):
+        """
+        Ensure each filter request is valid.
+
+        """
+        unknown_filters = set(filters) - set(cls.filterable_attrs or [])
+        if unknown_filters:
+            raise ValueError('Unknown filters added: {}'.format(', '.join(unknown_filters)))
+
+    @classmethod
+    def _local(cls, filters):
+        """
+        Return the snapshot if it can answer a query with these filters.
+
+        """
+        snapshot = cls.snapshot
+        if (snapshot is not None and snapshot.fresh and
+                snapshot.can_filter(**filters)):
+            return snapshot
+        return None
 
     @classmethod
-    def all(cls):
+    def _peek(cls, filters):
+        """
+        Return the raw first page of the (filtered) list with a page size of
+        one.
+
+        """
+        cls._check_filters(filters)
+        params = dict(filters)
+        params[cls.page_size_param] = 1
+        return request('get', strongarm.host + cls.endpoint, params=params)
+
+    @classmethod
+    def count(cls, **filters):
+        """
+        Return the number of instances matching the filters.
+
+        """
+        snapshot = cls._local(filters)
+        if snapshot is not None:
+            return len(snapshot.filter(**filters))
+        return cls._peek(filters)['count']
+
+    @classmethod
+    def exists(cls, **filters):
+        """
+        Return whether any instance matches the filters.
+
+        """
+        return cls.count(**filters) > 0
+
+    @classmethod
+    def first(cls, **filters):
+        """
+        Return the first instance matching the filters, or None.
+
+        """
+        snapshot = cls._local(filters)
+        if snapshot is not None:
+            elements = snapshot.filter(**filters)
+            return elements[0] if len(elements) else None
+
+        results = cls._peek(filters)['results']
+        return cls(results[0]) if results else None
+
+    @classmethod
+    def enable_snapshot(cls, interval=300, max_age=None):
+        """
+        Load a Snapshot of this resource, refresh it every `interval` seconds
+        and answer queries from it while it is fresh.
+
+        """
+        cls.disable_snapshot()
+        cls.snapshot = Snapshot(cls, interval, max_age).start()
+        return cls.snapshot
+
+    @classmethod
+    def disable_snapshot(cls):
+        if cls.snapshot is not None:
+            cls.snapshot.stop()
+            cls.snapshot = None
+
+    @classmethod
+    def all(cls, stream=False, deadline=None, checkpoint=None, live=False):
+        if (not live and checkpoint is None and cls.snapshot is not None and
+                cls.snapshot.fresh):
+            return cls.snapshot.all()
+
         endpoint = strongarm.host + cls.endpoint
-        return PaginatedResourceList(cls, endpoint)
+        return PaginatedResourceList(cls, endpoint, stream=stream,
+                                     deadline=deadline, checkpoint=checkpoint)
 
 
 class FilterableResource(ListableResource):
     """
     A mixin for a resource that can be filtered when being listed.
+
+    `filter_fields` maps the filters which a Snapshot can answer locally to
+    the attribute they match.
     """
-    filterable_attrs = None
+    filter_fields = None
 
     @classmethod
-    def filter(cls, **kwargs):
-        # Ensure each filter request is valid.
-        unknown_filters = set(kwargs.keys()) - set(cls.filterable_attrs)
-        if unknown_filters:
-            raise ValueError('Unknown filters added: {}'.format(', '.join(unknown_filters)))
+    def filter(cls, stream=False, deadline=None, checkpoint=None, live=False,
+               **kwargs):
+        cls._check_filters(kwargs)
+
+        snapshot = None
+        if not live and checkpoint is None:
+            snapshot = cls._local(kwargs)
+        if snapshot is not None:
+            return snapshot.filter(**kwargs)
 
         endpoint = strongarm.host + cls.endpoint
-        return PaginatedResourceList(cls, endpoint, params=kwargs)
+        return PaginatedResourceList(cls, endpoint, params=kwargs,
+                                     stream=stream, deadline=deadline,
+                                     checkpoint=checkpoint)
 
 
 class CreatableResource(object):
@@ -0,0 +1,208 @@
+"""
+Write-behind batching of creates and deletes.
+
+"""
+
+from collections import OrderedDict
+import threading
+
+from strongarm.common import (StrongarmException, _bind_context, _clock,
+                              _run_bounded, metrics)
+
+
+class MutationQueue(object):
+    """
+    Queue creates and deletes of a resource and apply them in the background.
+
+    `create` and `delete` return immediately. Pending changes to the same
+    instance are merged: the latest fields of repeated creates win, a create
+    followed by a delete cancels out, and a delete followed by a create
+    replaces the instance. Pending changes are applied in a batch once there
+    are `batch_size` of them or the oldest has waited `flush_interval`
+    seconds, with at most `workers` requests in flight.
+
+    `on_success(id, action, result)` and `on_error(id, action, exception)` are
+    called from the background thread as each change completes, where action
+    is 'create', 'delete' or 'replace'; exceptions they raise are ignored.
+    Failed changes are also collected in `failed`.
+
+    `flush` blocks until everything queued so far has been applied. Used as a
+    context manager, the queue is flushed and closed on exit.
+
+    Changes are applied with the credentials of the Tenant (and within the
+    Deadline) entered when the queue was created, if any.
+
+    """
+
+    def __init__(self, resource_cls, batch_size=100, flush_interval=1.0,
+                 workers=8, on_success=None, on_error=None):
+        self.resource_cls = resource_cls
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.workers = workers
+        self.on_success = on_success
+        self.on_error = on_error
+        self.failed = []
+
+        self.__cond = threading.Condition()
+        # The pending (action, fields) for each id, in the order first queued.
+        self.__pending = OrderedDict()
+        self.__oldest = None
+        # Sequence numbers of the last change queued, taken to be applied (or
+        # cancelled), applied, and requested to be flushed.
+        self.__queued = 0
+        self.__taken = 0
+        self.__applied = 0
+        self.__flush_to = 0
+        self.__in_flight = False
+        self.__closed = False
+
+        # Changes are applied under the Tenant and Deadline of the creator.
+        self.__thread = threading.Thread(target=_bind_context(self.__run))
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __len__(self):
+        with self.__cond:
+            return len(self.__pending)
+
+    def create(self, id, **fields):
+        """
+        Queue the creation of an instance with the given id and fields.
+
+        """
+        self.__queue(id, 'create', fields)
+
+    def delete(self, id):
+        """
+        Queue the deletion of the instance with the given id.
+
+        """
+        self.__queue(id, 'delete', None)
+
+    def __queue(self, id, action, fields):
+        with self.__cond:
+            if self.__closed:
+                raise StrongarmException("The mutation queue is closed")
+
+            self.__queued += 1
+            metrics.incr('mutations_queued')
+
+            previous = self.__pending.get(id, (None, None))[0]
+            if previous == 'create' and action == 'delete':
+                # The instance was never created, so there is nothing to do.
+                del self.__pending[id]
+                metrics.incr('mutations_cancelled', 2)
+                if not self.__pending:
+                    self.__taken = self.__queued
+                    self.__oldest = None
+                return
+            if previous in ('delete', 'replace') and action == 'create':
+                action = 'replace'
+
+            if previous is not None:
+                metrics.incr('mutations_merged')
+            # Replacing an existing entry keeps its position in the queue.
+            self.__pending[id] = (action, fields)
+
+            if self.__oldest is None:
+                self.__oldest = _clock()
+            if len(self.__pending) >= self.batch_size:
+                self.__cond.notify_all()
+
+    def __apply(self, change):
+        id, (action, fields) = change
+        cls = self.resource_cls
+        result = None
+
+        if action in ('delete', 'replace'):
+            cls({cls.id_attr: id}).delete()
+        if action in ('create', 'replace'):
+            fields = dict(fields)
+            fields[cls.id_attr] = id
+            result = cls.create(**fields)
+
+        return result
+
+    def __due(self):
+        """
+        Whether the pending changes should be applied now.
+
+        """
+        if not self.__pending:
+            return False
+        return (self.__closed or self.__flush_to > self.__taken or
+                len(self.__pending) >= self.batch_size or
+                _clock() - self.__oldest >= self.flush_interval)
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                while not self.__due():
+                    if self.__closed and not self.__pending:
+                        return
+                    if self.__pending:
+                        timeout = (self.__oldest + self.flush_interval -
+                                   _clock())
+                    else:
+                        timeout = None
+                    self.__cond.wait(timeout)
+
+                batch = list(self.__pending.items())
+                sequence = self.__taken = self.__queued
+                self.__pending = OrderedDict()
+                self.__oldest = None
+                self.__in_flight = True
+
+            for (id, (action, _)), result, error in _run_bounded(
+                    self.__apply, batch, self.workers):
+                if error is None:
+                    metrics.incr('mutations_applied')
+                    callback, args = self.on_success, (id, action, result)
+                else:
+                    metrics.incr('mutations_failed')
+                    self.failed.append((id, action, error))
+                    callback, args = self.on_error, (id, action, error)
+
+                if callback is not None:
+                    try:
+                        callback(*args)
+                    except Exception:
+                        pass
+
+            with self.__cond:
+                self.__applied = sequence
+                self.__in_flight = False
+                self.__cond.notify_all()
+
+    def flush(self):
+        """
+        Apply everything queued so far and wait for it to complete.
+
+        """
+        with self.__cond:
+            target = self.__queued
+            self.__flush_to = max(self.__flush_to, target)
+            self.__cond.notify_all()
+            # Changes which cancelled out are never applied, so also stop once
+            # nothing is left to do.
+            while self.__applied < target and (self.__pending or
+                                               self.__in_flight):
+                self.__cond.wait()
+
+    def close(self):
+        """
+        Apply everything queued, stop the background thread and reject any
+        further changes.
+
+        """
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+        self.__thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
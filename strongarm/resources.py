@@ -1,8 +1,38 @@
 from strongarm.common import (CreatableResource,
+                              Deadline,
                               DeletableResource,
                               FilterableResource,
                               ListableResource,
-                              StrongResource)
+                              StrongResource,
+                              _run_bounded)
+
+
+class ReconcileResult(object):
+    """
+    The changes made (or, for a dry run, planned) by `Domain.reconcile`.
+
+    `created`, `deleted` and `updated` are sorted lists of domain names.
+    Updated domains existed with a different status and were re-created with
+    the requested one. `failed` maps the name of each domain whose change
+    raised an exception to that exception.
+
+    """
+
+    def __init__(self, created, deleted, updated, dry_run=False):
+        self.created = created
+        self.deleted = deleted
+        self.updated = updated
+        self.failed = {}
+        self.dry_run = dry_run
+
+    def __len__(self):
+        return len(self.created) + len(self.deleted) + len(self.updated)
+
+    def __repr__(self):
+        return ("%s(created=%d, deleted=%d, updated=%d, failed=%d, dry_run=%s)"
+                % (self.__class__.__name__, len(self.created),
+                   len(self.deleted), len(self.updated), len(self.failed),
+                   self.dry_run))
 
 
 class Domain(StrongResource, CreatableResource, DeletableResource, FilterableResource):
@@ -11,6 +41,7 @@ class Domain(StrongResource, CreatableResource, DeletableResource, FilterableRes
     # The domain name is used as the unique identifier passed in the url.
     id_attr = 'name'
     filterable_attrs = ['statuses']
+    filter_fields = {'statuses': 'status'}
 
     # Constants for use with the status field.
     # A blacklisted domain will be redirected to the Strongarm blackhole when
@@ -24,6 +55,60 @@ class Domain(StrongResource, CreatableResource, DeletableResource, FilterableRes
     # A filtered domain will be blocked for content filtering.
     FILTERED = 'filtered'
 
+    @classmethod
+    def reconcile(cls, desired, status=BLACKLISTED, dry_run=False, workers=8,
+                  deadline=None):
+        """
+        Make the domains with the given status exactly the `desired` names.
+
+        The current domain list is fetched once. Desired names that do not
+        exist are created, names with this status that are not desired are
+        deleted, and desired names that exist with another status are deleted
+        and re-created with this one. Changes run with at most `workers`
+        requests in flight, which may be an AdaptiveLimit.
+
+        Return a ReconcileResult. With `dry_run` nothing is changed and the
+        result describes what would have been done. A `deadline` bounds the
+        time taken by the whole reconciliation; changes not made in time are
+        reported as failed.
+
+        """
+        deadline = Deadline.coerce(deadline) or Deadline.current()
+        desired = set(desired)
+
+        current = {}
+        for domain in cls.all(deadline=deadline, live=True):
+            current[domain.name] = getattr(domain, 'status', None)
+
+        result = ReconcileResult(
+            created=sorted(desired.difference(current)),
+            deleted=sorted(name for name, s in current.items()
+                           if s == status and name not in desired),
+            updated=sorted(name for name in desired.intersection(current)
+                           if current[name] != status),
+            dry_run=dry_run)
+
+        if dry_run:
+            return result
+
+        def apply(change):
+            action, name = change
+            if action in ('delete', 'update'):
+                cls({cls.id_attr: name}).delete()
+            if action in ('create', 'update'):
+                cls.create(name=name, status=status)
+
+        changes = ([('create', name) for name in result.created] +
+                   [('delete', name) for name in result.deleted] +
+                   [('update', name) for name in result.updated])
+
+        for (action, name), _, error in _run_bounded(apply, changes, workers,
+                                                     deadline):
+            if error is not None:
+                result.failed[name] = error
+
+        return result
+
 
 class Infection(StrongResource, ListableResource):
     endpoint = '/api/infections/'
@@ -0,0 +1,218 @@
+"""
+A compact, sorted, memory-mapped snapshot file of domain names and statuses.
+
+Every process opening the same file shares one copy of it in the page cache,
+instead of each holding its own list of Domain objects. Lookups binary search
+the sorted index in place without loading the file.
+
+The layout (all integers little-endian) is a header, a table of the distinct
+statuses, an index of fixed-size records sorted by name, and the names
+themselves:
+
+    header:   magic (8 bytes), count, index offset, names offset (uint32)
+    statuses: number of statuses (uint8), then for each its length (uint8)
+              and UTF-8 bytes
+    index:    for each domain, the offset of its name in the names section
+              (uint32), the name's length (uint16), its status number
+              (uint8) and a padding byte
+    names:    the UTF-8 encoded, lowercased names, concatenated
+
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from strongarm.common import StrongarmException
+
+_MAGIC = b'SADOMS01'
+_HEADER = struct.Struct('<8sIII')
+_RECORD = struct.Struct('<IHBx')
+_BYTE = struct.Struct('<B')
+
+
+def _encode(name):
+    if not isinstance(name, bytes):
+        name = name.encode('utf-8')
+    return name.lower()
+
+
+def write_snapshot(path, domains=None):
+    """
+    Write a snapshot of `domains` (by default every Domain) to `path` and
+    return the number of domains written.
+
+    The file is written next to `path` and renamed over it, so readers see
+    either the old or the new snapshot and never a partial one.
+
+    """
+    if domains is None:
+        from strongarm.resources import Domain
+        domains = Domain.all(stream=True, live=True)
+
+    statuses = {}
+    entries = {}
+    for domain in domains:
+        status = getattr(domain, 'status', None) or ''
+        if status not in statuses:
+            if len(statuses) == 255:
+                raise StrongarmException("Too many distinct statuses")
+            statuses[status] = len(statuses)
+        entries[_encode(domain.name)] = statuses[status]
+
+    status_table = [_BYTE.pack(len(statuses))]
+    for status in sorted(statuses, key=statuses.get):
+        encoded = status.encode('utf-8')
+        status_table.append(_BYTE.pack(len(encoded)) + encoded)
+    status_table = b''.join(status_table)
+
+    names = sorted(entries)
+    index_offset = _HEADER.size + len(status_table)
+    names_offset = index_offset + _RECORD.size * len(names)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(names), index_offset, names_offset))
+            f.write(status_table)
+            offset = 0
+            for name in names:
+                f.write(_RECORD.pack(offset, len(name), entries[name]))
+                offset += len(name)
+            for name in names:
+                f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Temporary files are only readable by their owner.
+        os.chmod(tmp_path, 0o644)
+
+        # os.rename does not replace existing files on Windows.
+        getattr(os, 'replace', os.rename)(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return len(names)
+
+
+class _Mapping(object):
+    """
+    One opened snapshot file.
+
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime, stat.st_size)
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, self.index_offset, self.names_offset = \
+            _HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC:
+            raise StrongarmException("%s is not a domain snapshot" % path)
+
+        self.statuses = []
+        offset = _HEADER.size
+        (status_count,) = _BYTE.unpack_from(self.mm, offset)
+        offset += 1
+        for _ in range(status_count):
+            (length,) = _BYTE.unpack_from(self.mm, offset)
+            self.statuses.append(
+                self.mm[offset + 1:offset + 1 + length].decode('utf-8') or None)
+            offset += 1 + length
+
+    def record(self, i):
+        """
+        Return the (name, status) of the i-th domain in sorted order.
+
+        """
+        offset, length, status = _RECORD.unpack_from(
+            self.mm, self.index_offset + i * _RECORD.size)
+        start = self.names_offset + offset
+        return self.mm[start:start + length], self.statuses[status]
+
+    def find(self, name):
+        """
+        Binary search for an encoded name, return its status or raise
+        KeyError.
+
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, status = self.record(mid)
+            if found < name:
+                lo = mid + 1
+            elif found > name:
+                hi = mid
+            else:
+                return status
+        raise KeyError(name)
+
+
+class SnapshotFile(object):
+    """
+    Read-only access to a snapshot written by `write_snapshot`.
+
+    `status(name)` returns the status of a domain (None if it has none) and
+    raises KeyError if it is not in the snapshot; `in` tests membership.
+    Names are compared case-insensitively. Iterating yields (name, status)
+    pairs in sorted order.
+
+    If `check_interval` is given, the file is checked at most that often
+    during lookups and a newer snapshot renamed over it is swapped in.
+    `reload` does the same on demand.
+
+    """
+
+    def __init__(self, path, check_interval=None):
+        self.path = path
+        self.check_interval = check_interval
+        self.__mapping = _Mapping(path)
+        self.__checked = time.time()
+
+    def reload(self):
+        """
+        Swap in the file at `path` if it was replaced, returning whether it
+        was.
+
+        """
+        self.__checked = time.time()
+        stat = os.stat(self.path)
+        if (stat.st_ino, stat.st_mtime, stat.st_size) == self.__mapping.identity:
+            return False
+
+        # Lookups in progress keep using the old mapping, which is unmapped
+        # once they no longer reference it.
+        self.__mapping = _Mapping(self.path)
+        return True
+
+    def __current(self):
+        if (self.check_interval is not None and
+                time.time() - self.__checked >= self.check_interval):
+            self.reload()
+        return self.__mapping
+
+    def status(self, name):
+        return self.__current().find(_encode(name))
+
+    def __contains__(self, name):
+        try:
+            self.status(name)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return self.__current().count
+
+    def __iter__(self):
+        mapping = self.__current()
+        for i in range(mapping.count):
+            name, status = mapping.record(i)
+            yield name.decode('utf-8'), status
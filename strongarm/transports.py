@@ -0,0 +1,301 @@
+"""
+Transports carry the HTTP requests made by `strongarm.common.request`.
+
+A transport sends a single request and returns a Response whose body has not
+been read yet. Authentication, compression, timeouts and error handling are
+left to `request`, so transports only move bytes. No transport follows
+redirects; it is generally bad practice for an API library to do so.
+
+Set `strongarm.transport` to use a transport for every request, or pass one to
+`request` directly.
+
+"""
+
+import json
+import re
+
+from six import binary_type, iteritems, text_type
+from six.moves.urllib.parse import parse_qs, urlencode, urlparse
+
+from strongarm.common import StrongarmTimeout, _Decompressor
+
+
+def _charset(content_type):
+    """
+    Return the charset parameter of a Content-Type header, if any.
+
+    """
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or '')
+    return match.group(1) if match else None
+
+
+def _add_params(url, params):
+    """
+    Append query parameters (a dict whose values may be lists) to a URL.
+
+    """
+    if not params:
+        return url
+    return url + ('&' if '?' in url else '?') + urlencode(params, doseq=True)
+
+
+class Response(object):
+    """
+    A response returned by a transport.
+
+    `status_code` is the HTTP status and `headers` a case-insensitive mapping.
+    `stream` yields the body exactly as received (i.e. still compressed) and
+    `close` releases the connection.
+
+    """
+
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+    @property
+    def encoding(self):
+        return _charset(self.headers.get('Content-Type'))
+
+    def stream(self, chunk_size):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Transport(object):
+    """
+    The interface of a transport.
+
+    """
+
+    def send(self, method, url, params=None, data=None, headers=None,
+             timeout=None, verify=True):
+        """
+        Send a request and return a Response, raising StrongarmTimeout if it
+        times out. `timeout` is a number of seconds or a (connect, read)
+        tuple, either of which may be None to wait forever.
+
+        """
+        raise NotImplementedError
+
+
+class _RequestsResponse(Response):
+
+    def __init__(self, res):
+        super(_RequestsResponse, self).__init__(res.status_code, res.headers)
+        self.__res = res
+
+    def stream(self, chunk_size):
+        from requests.packages.urllib3.exceptions import ReadTimeoutError
+
+        try:
+            for chunk in self.__res.raw.stream(chunk_size, decode_content=False):
+                yield chunk
+        except ReadTimeoutError as e:
+            raise StrongarmTimeout("Timed out reading response: %s" % e)
+
+    def close(self):
+        self.__res.close()
+
+
+class RequestsTransport(Transport):
+    """
+    Send requests with the `requests` library, reusing connections through a
+    session. Any extra keyword arguments are passed on to the session.
+
+    Unless a `session` is given, the session keeps up to `pool_maxsize`
+    connections per host and never stores cookies, so that no state is
+    carried from one API key to another.
+
+    """
+
+    def __init__(self, session=None, pool_maxsize=64):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from six.moves.http_cookiejar import DefaultCookiePolicy
+
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def send(self, method, url, timeout=None, **kwargs):
+        import requests
+
+        try:
+            res = self.session.request(method, url, timeout=timeout,
+                                       allow_redirects=False, stream=True,
+                                       **kwargs)
+        except requests.exceptions.Timeout as e:
+            raise StrongarmTimeout("Request timed out: %s" % e)
+        return _RequestsResponse(res)
+
+
+class _Urllib3Response(Response):
+
+    def __init__(self, res):
+        super(_Urllib3Response, self).__init__(res.status, res.headers)
+        self.__res = res
+
+    def stream(self, chunk_size):
+        from urllib3.exceptions import TimeoutError
+
+        try:
+            for chunk in self.__res.stream(chunk_size, decode_content=False):
+                yield chunk
+        except TimeoutError as e:
+            raise StrongarmTimeout("Timed out reading response: %s" % e)
+
+    def close(self):
+        self.__res.release_conn()
+
+
+class Urllib3Transport(Transport):
+    """
+    Send requests directly with a `urllib3` connection pool, skipping the
+    overhead of `requests`. Keyword arguments configure the PoolManager, e.g.
+    `maxsize` to keep more connections per host for concurrent use.
+
+    """
+
+    def __init__(self, **pool_kwargs):
+        import urllib3
+
+        try:
+            import certifi
+            pool_kwargs.setdefault('ca_certs', certifi.where())
+        except ImportError:
+            pass
+
+        self.__urllib3 = urllib3
+        self.__pool_kwargs = pool_kwargs
+        self.pool = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', **pool_kwargs)
+        self.__insecure_pool = None
+
+    def send(self, method, url, params=None, data=None, headers=None,
+             timeout=None, verify=True):
+        urllib3 = self.__urllib3
+
+        pool = self.pool
+        if not verify:
+            if self.__insecure_pool is None:
+                self.__insecure_pool = urllib3.PoolManager(
+                    cert_reqs='CERT_NONE', **self.__pool_kwargs)
+            pool = self.__insecure_pool
+
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        elif timeout is not None:
+            timeout = urllib3.Timeout(timeout)
+
+        try:
+            res = pool.request(method.upper(), _add_params(url, params),
+                               body=data, headers=headers, timeout=timeout,
+                               retries=False, redirect=False,
+                               preload_content=False, decode_content=False)
+        except urllib3.exceptions.TimeoutError as e:
+            raise StrongarmTimeout("Request timed out: %s" % e)
+        return _Urllib3Response(res)
+
+
+class _Headers(dict):
+    """
+    A minimal case-insensitive dictionary of headers.
+
+    """
+
+    def __init__(self, headers=None):
+        super(_Headers, self).__init__()
+        for key, value in iteritems(dict(headers or {})):
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        super(_Headers, self).__setitem__(key.lower(), value)
+
+    def __getitem__(self, key):
+        return super(_Headers, self).__getitem__(key.lower())
+
+    def __contains__(self, key):
+        return super(_Headers, self).__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super(_Headers, self).get(key.lower(), default)
+
+
+class InProcessRequest(object):
+    """
+    A request passed to the handler of an InProcessTransport.
+
+    `params` maps each query parameter to a list of values, `headers` is
+    case-insensitive and `body` holds the bytes sent (decompressed if they
+    were gzip encoded) or None.
+
+    """
+
+    def __init__(self, method, url, params, headers, body):
+        self.method = method.upper()
+        self.url = url
+        parsed = urlparse(url)
+        self.path = parsed.path
+        self.params = parse_qs(parsed.query)
+        for key, value in iteritems(params or {}):
+            values = value if isinstance(value, (list, tuple)) else [value]
+            self.params.setdefault(key, []).extend(str(v) for v in values)
+        self.headers = _Headers(headers)
+
+        if isinstance(body, text_type):
+            body = body.encode('utf-8')
+        if body is not None:
+            decompressor = _Decompressor(self.headers.get('Content-Encoding'))
+            body = decompressor.decompress(body) + decompressor.flush()
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class _InProcessResponse(Response):
+
+    def __init__(self, status_code, headers, body):
+        super(_InProcessResponse, self).__init__(status_code, _Headers(headers))
+        self.__body = body
+
+    def stream(self, chunk_size):
+        for start in range(0, len(self.__body), chunk_size):
+            yield self.__body[start:start + chunk_size]
+
+
+class InProcessTransport(Transport):
+    """
+    Route requests straight into a Python function, with no sockets involved.
+
+    `handler(request)` is called with an InProcessRequest and returns a
+    (status_code, headers, body) tuple. The body may be bytes, text, None, or
+    any other object, which is encoded as JSON. Exceptions raised by the
+    handler are propagated to the caller of `request`.
+
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def send(self, method, url, params=None, data=None, headers=None,
+             timeout=None, verify=True):
+        status_code, res_headers, body = self.handler(
+            InProcessRequest(method, url, params, headers, data))
+
+        res_headers = dict(res_headers or {})
+        if body is None:
+            body = b''
+        elif not isinstance(body, (binary_type, text_type)):
+            body = json.dumps(body)
+            res_headers.setdefault('Content-Type', 'application/json')
+        if isinstance(body, text_type):
+            body = body.encode('utf-8')
+
+        return _InProcessResponse(status_code, res_headers, body)
@@ -0,0 +1,181 @@
+"""Tests for strongarm.cli."""
+
+import json
+import os
+import tempfile
+import unittest
+
+import requests
+import responses
+from six import StringIO
+
+import strongarm
+from strongarm.cli import main
+from strongarm.resources import Domain
+
+
+class CliTestCase(unittest.TestCase):
+
+    list_response = {
+        "count": 2,
+        "next": None,
+        "previous": None,
+        "results": [
+            {"name": "0.example.com", "status": "blacklisted"},
+            {"name": "1.example.com", "status": "whitelisted"},
+        ]
+    }
+
+    def setUp(self):
+        self.host = strongarm.host
+
+    def tearDown(self):
+        strongarm.host = self.host
+
+    def run_cli(self, argv, stdin=''):
+        stdout, stderr = StringIO(), StringIO()
+        status = main(['--api-key', 'token'] + argv, stdin=StringIO(stdin),
+                      stdout=stdout, stderr=stderr)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    @responses.activate
+    def test_create_from_stdin(self):
+        """
+        Test that every name read from stdin is created with the given status,
+        skipping blank lines and comments.
+
+        """
+
+        def create(request):
+            return (201, {}, request.body)
+
+        responses.add_callback(responses.POST, strongarm.host + Domain.endpoint,
+                               callback=create,
+                               content_type='application/json')
+
+        names = ['%d.example.com' % i for i in range(20)]
+        stdin = '# blacklist\n\n' + '\n'.join(names) + '\n'
+        status, stdout, stderr = self.run_cli(
+            ['create', '--status', 'blacklisted', '-w', '4'], stdin)
+
+        self.assertEqual(status, 0)
+        created = [json.loads(c.request.body) for c in responses.calls]
+        self.assertEqual(sorted(d['name'] for d in created), sorted(names))
+        self.assertTrue(all(d['status'] == 'blacklisted' for d in created))
+        self.assertIn('create: 20 succeeded, 0 failed', stderr)
+
+    def test_invalid_workers(self):
+        """
+        Test that fewer than one worker is rejected.
+
+        """
+        for workers in ['0', '-1', 'many']:
+            with self.assertRaises(SystemExit):
+                self.run_cli(['delete', '-w', workers], 'a.example.com\n')
+        with self.assertRaises(SystemExit):
+            self.run_cli(['delete', '-w', 'auto', '--max-workers', '0'])
+
+    @responses.activate
+    def test_adaptive_workers(self):
+        """
+        Test that the number of workers can adapt to the API.
+
+        """
+        responses.add(responses.DELETE,
+                      strongarm.host + Domain.endpoint + 'a.example.com/',
+                      status=204)
+
+        status, stdout, stderr = self.run_cli(
+            ['delete', '-w', 'auto', '--max-workers', '8'], 'a.example.com\n')
+
+        self.assertEqual(status, 0)
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(strongarm.metrics.get('concurrency_limit'), 4)
+
+    @responses.activate
+    def test_delete_failures(self):
+        """
+        Test that failures are summarized and make the exit status non-zero.
+
+        """
+
+        responses.add(responses.DELETE,
+                      strongarm.host + Domain.endpoint + 'a.example.com/',
+                      status=204)
+        responses.add(responses.DELETE,
+                      strongarm.host + Domain.endpoint + 'b.example.com/',
+                      status=404, content_type='application/json',
+                      body=json.dumps({'detail': 'Not found.'}))
+
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('a.example.com\nb.example.com\n')
+            status, stdout, stderr = self.run_cli(['delete', path])
+        finally:
+            os.remove(path)
+
+        self.assertEqual(status, 1)
+        self.assertIn('delete: 1 succeeded, 1 failed', stderr)
+        self.assertIn('b.example.com:', stderr)
+
+    def test_missing_file(self):
+        """
+        Test that a missing input file is rejected before anything is done.
+
+        """
+        path = os.path.join(tempfile.gettempdir(), 'strongarm-missing.txt')
+        with self.assertRaises(SystemExit):
+            self.run_cli(['create', path])
+
+    @responses.activate
+    def test_connection_error(self):
+        """
+        Test that an unreachable API is summarized as a failure.
+
+        """
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=requests.ConnectionError("Connection refused"))
+
+        status, stdout, stderr = self.run_cli(['list'])
+        self.assertEqual(status, 1)
+        self.assertIn('list: 0 succeeded, 1 failed', stderr)
+        self.assertIn('Connection refused', stderr)
+
+    @responses.activate
+    def test_list_and_export(self):
+        """
+        Test that list writes names and export writes JSON lines.
+
+        """
+
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps(self.list_response),
+                      content_type='application/json')
+
+        status, stdout, stderr = self.run_cli(['list'])
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout, '0.example.com\n1.example.com\n')
+
+        status, stdout, stderr = self.run_cli(['export', '--status',
+                                               'whitelisted'])
+        self.assertEqual(status, 0)
+        self.assertEqual([json.loads(line) for line in stdout.splitlines()],
+                         self.list_response['results'])
+        self.assertIn('statuses=whitelisted', responses.calls[1].request.url)
+
+    @responses.activate
+    def test_host(self):
+        """
+        Test that the host can be set on the command line.
+
+        """
+
+        responses.add(responses.GET, 'http://localhost/api/domains/x.com/',
+                      body=json.dumps({'name': 'x.com'}),
+                      content_type='application/json')
+
+        status, stdout, stderr = self.run_cli(['--host', 'http://localhost',
+                                               'get'], 'x.com\n')
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(stdout), {'name': 'x.com'})
@@ -2,13 +2,23 @@
 
 from math import ceil
 import json
+from multiprocessing.pool import ThreadPool
+import pickle
+import threading
+import time
 import unittest
+import zlib
 
+import requests
 import responses
 from six.moves.urllib.parse import parse_qs, urlparse
 
 import strongarm
-from strongarm.common import request, Struct, PaginatedResourceList
+from strongarm.common import (AdaptiveLimit, CircuitBreaker, Deadline,
+                              Hedging, metrics, request, Struct, Tenant,
+                              PaginatedResourceList, _cap_timeout, _iter_page,
+                              _pipeline, _run_bounded, fan_out)
+from strongarm.transports import InProcessTransport
 
 
 class RequestTestCase(unittest.TestCase):
@@ -158,6 +168,132 @@ class RequestTestCase(unittest.TestCase):
         with self.assertRaises(strongarm.StrongarmException) as exp:
             request('get', self.url)
 
+    @responses.activate
+    def test_compressed_response(self):
+        """
+        Test that compression is negotiated, a gzip encoded response is decoded,
+        and the bytes on the wire are counted.
+
+        """
+
+        data = {'results': ['%d.example.com' % i for i in range(100)]}
+        body = json.dumps(data).encode('utf-8')
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compressed = compressor.compress(body) + compressor.flush()
+
+        def gzipped(request):
+            self.assertEqual(request.headers['Accept-Encoding'], 'gzip, deflate')
+            return (200, {'Content-Encoding': 'gzip'}, compressed)
+
+        responses.add_callback(responses.GET, self.url, callback=gzipped,
+                               content_type='application/json')
+
+        metrics.reset()
+        self.assertEqual(request('get', self.url), data)
+        self.assertEqual(metrics.get('bytes_received'), len(compressed))
+        self.assertEqual(metrics.get('bytes_received_decoded'), len(body))
+
+    @responses.activate
+    def test_compressed_request(self):
+        """
+        Test that a request body is gzip encoded when asked to.
+
+        """
+
+        data = json.dumps({'name': 'example.com'})
+
+        def assert_gzipped(request):
+            self.assertEqual(request.headers['Content-Encoding'], 'gzip')
+            body = zlib.decompress(request.body, 16 + zlib.MAX_WBITS)
+            self.assertEqual(body.decode('utf-8'), data)
+            return (201, {}, body)
+
+        responses.add_callback(responses.POST, self.url, callback=assert_gzipped,
+                               content_type='application/json')
+
+        metrics.reset()
+        request('post', self.url, data=data, compress=True)
+        self.assertEqual(metrics.get('bytes_sent_uncompressed'), len(data))
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_compression_threshold(self):
+        """
+        Test that only request bodies over the configured threshold are
+        compressed.
+
+        """
+
+        def echo_encoding(request):
+            encoding = request.headers.get('Content-Encoding', 'identity')
+            return (200, {}, json.dumps(encoding))
+
+        responses.add_callback(responses.POST, self.url, callback=echo_encoding,
+                               content_type='application/json')
+
+        strongarm.request_compression_threshold = 100
+        try:
+            self.assertEqual(request('post', self.url, data='x' * 10), 'identity')
+            self.assertEqual(request('post', self.url, data='x' * 100), 'gzip')
+        finally:
+            strongarm.request_compression_threshold = None
+
+    @responses.activate
+    def test_timeout(self):
+        """
+        Test that a timed out request raises StrongarmTimeout.
+
+        """
+
+        responses.add(responses.GET, self.url,
+                      body=requests.exceptions.ConnectTimeout())
+
+        with self.assertRaises(strongarm.StrongarmTimeout) as exp:
+            request('get', self.url, timeout=1)
+        self.assertNotIsInstance(exp.exception,
+                                 strongarm.StrongarmDeadlineExceeded)
+
+    @responses.activate
+    def test_deadline_exceeded(self):
+        """
+        Test that no request is made once the deadline has passed, whether it
+        is given explicitly or entered as a context manager.
+
+        """
+
+        responses.add(responses.GET, self.url, json={})
+
+        deadline = Deadline(60)
+        self.assertEqual(request('get', self.url, deadline=deadline), {})
+
+        deadline.expires -= 60
+        with self.assertRaises(strongarm.StrongarmDeadlineExceeded):
+            request('get', self.url, deadline=deadline)
+
+        with deadline:
+            with self.assertRaises(strongarm.StrongarmDeadlineExceeded):
+                request('get', self.url)
+            # The deadline is carried into worker threads.
+            outcomes = _run_bounded(lambda _: request('get', self.url),
+                                    range(3), workers=3)
+            for _, _, error in outcomes:
+                self.assertIsInstance(error, strongarm.StrongarmDeadlineExceeded)
+
+        self.assertIsNone(Deadline.current())
+        self.assertEqual(len(responses.calls), 1)
+
+    def test_cap_timeout(self):
+        """
+        Test that every form of timeout is capped by the time remaining.
+
+        """
+
+        self.assertEqual(_cap_timeout(None, 5), 5)
+        self.assertEqual(_cap_timeout(10, 5), 5)
+        self.assertEqual(_cap_timeout(3, 5), 3)
+        self.assertEqual(_cap_timeout((3, 10), 5), (3, 5))
+        self.assertEqual(_cap_timeout((None, 3), 5), (5, 3))
+
 
 class StructTestCase(unittest.TestCase):
 
@@ -325,3 +461,695 @@ class PaginationTestCase(unittest.TestCase):
         entire_list = list(self.plist)
         self.assertEqual(entire_list, list(range(self.total)))
         self.assertEqual(len(responses.calls), self.lazy_pages(self.total-1))
+
+    @responses.activate
+    def test_stream_lazy(self):
+        """
+        Test that a streaming paginated list returns the same elements and
+        requests the same pages as a buffered one.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint, stream=True)
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(len(self.plist), self.total)
+
+        self.assertEqual(self.plist[5], 5)
+        self.assertEqual(len(responses.calls), self.lazy_pages(5))
+
+        self.assertEqual(list(self.plist), list(range(self.total)))
+        self.assertEqual(len(responses.calls), self.lazy_pages(self.total-1))
+
+    @responses.activate
+    def test_shards(self):
+        """
+        Test that shards cover every page exactly once, in order, survive
+        pickling, and only fetch their own pages.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint)
+
+        shards = self.plist.shards(2)
+        self.assertEqual([(s.start, s.stop) for s in shards], [(1, 3), (3, 5)])
+        self.assertEqual([(s.start, s.stop) for s in
+                          self.plist.shards(pages_per_shard=3)],
+                         [(1, 4), (4, 5)])
+
+        shards = pickle.loads(pickle.dumps(shards))
+        self.assertEqual(list(shards[1]), list(range(8, self.total)))
+        self.assertEqual(len(responses.calls), 1 + len(shards[1]))
+
+        self.assertEqual([e for shard in shards for e in shard],
+                         list(range(self.total)))
+
+    @responses.activate
+    def test_shards_invalid(self):
+        self.plist = PaginatedResourceList(int, self.endpoint)
+        self.assertRaises(ValueError, self.plist.shards)
+        self.assertRaises(ValueError, self.plist.shards, 2, 2)
+
+    @responses.activate
+    def test_map_shards(self):
+        """
+        Test that mapping over shards in a pool merges the results in order.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint, stream=True)
+
+        pool = ThreadPool(3)
+        try:
+            self.assertEqual(list(self.plist.map_shards(str, pool)),
+                             [str(i) for i in range(self.total)])
+            self.assertEqual(sorted(self.plist.map_shards(abs, pool, count=4,
+                                                          ordered=False)),
+                             list(range(self.total)))
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_shards_in_memory(self):
+        """
+        Test that a list held in memory is split into lists of its elements.
+
+        """
+        self.plist = PaginatedResourceList._from_elements(int, range(10))
+        self.assertEqual(self.plist.shards(3),
+                         [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(self.plist.shards(pages_per_shard=1), [list(range(10))])
+
+        pool = ThreadPool(3)
+        try:
+            self.assertEqual(list(self.plist.map_shards(str, pool)),
+                             [str(i) for i in range(10)])
+        finally:
+            pool.close()
+            pool.join()
+
+    @responses.activate
+    def test_map_ordered(self):
+        """
+        Test that map returns results in list order even when they complete
+        out of order, fetching every page once.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint)
+
+        def slow_square(i):
+            time.sleep(0.001 * (i % 3))
+            return i * i
+
+        self.assertEqual(list(self.plist.map(slow_square, workers=4)),
+                         [i * i for i in range(self.total)])
+        self.assertEqual(len(responses.calls), self.pages)
+
+    @responses.activate
+    def test_map_unordered(self):
+        self.plist = PaginatedResourceList(int, self.endpoint, stream=True)
+
+        self.assertEqual(sorted(self.plist.map(abs, workers=3, ordered=False)),
+                         list(range(self.total)))
+
+    @responses.activate
+    def test_map_workers(self):
+        """
+        Test that mapping with no workers fails instead of hanging.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint)
+        with self.assertRaises(ValueError):
+            self.plist.map(str, workers=0)
+        with self.assertRaises(ValueError):
+            list(_pipeline(str, [1], -1))
+
+    @responses.activate
+    def test_map_error(self):
+        """
+        Test that an exception raised by the mapped function is re-raised
+        after the results preceding it.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint)
+
+        def fail_on_five(i):
+            if i == 5:
+                raise KeyError(i)
+            return i
+
+        results = []
+        with self.assertRaises(KeyError):
+            for result in self.plist.map(fail_on_five, workers=2):
+                results.append(result)
+        self.assertEqual(results, list(range(5)))
+
+    @responses.activate
+    def test_for_each(self):
+        self.plist = PaginatedResourceList(int, self.endpoint)
+
+        seen = []
+        self.plist.for_each(seen.append, workers=2)
+        self.assertEqual(sorted(seen), list(range(self.total)))
+
+    def test_pipeline_backpressure(self):
+        """
+        Test that no more than the buffer size is read ahead of the consumer.
+
+        """
+        consumed = []
+
+        def produce():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = _pipeline(abs, produce(), workers=2, buffer=4)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.05)
+        self.assertLessEqual(len(consumed), 5)
+        self.assertEqual(list(results), list(range(1, 100)))
+
+    def test_pipeline_iteration_error(self):
+        """
+        Test that an exception raised while iterating is re-raised.
+
+        """
+        def produce():
+            yield 1
+            raise strongarm.StrongarmException("page fetch failed")
+
+        results = _pipeline(abs, produce(), workers=2)
+        self.assertEqual(next(results), 1)
+        self.assertRaises(strongarm.StrongarmException, next, results)
+
+    @responses.activate
+    def test_deadline(self):
+        """
+        Test that a deadline carries across every page fetched by the list.
+
+        """
+        deadline = Deadline(60)
+        self.plist = PaginatedResourceList(int, self.endpoint, deadline=deadline)
+        self.assertEqual(self.plist[5], 5)
+
+        deadline.expires -= 60
+        with self.assertRaises(strongarm.StrongarmDeadlineExceeded):
+            list(self.plist)
+        self.assertEqual(len(responses.calls), self.lazy_pages(5))
+
+    @responses.activate
+    def test_checkpoint(self):
+        """
+        Test that a list resumed from the checkpoint of a page only fetches and
+        holds the pages after it.
+
+        """
+        self.plist = PaginatedResourceList(int, self.endpoint, stream=True)
+        pages = self.plist.pages()
+        elements, checkpoint = next(pages)
+        self.assertEqual(elements, list(range(self.per_page)))
+        elements, checkpoint = next(pages)
+        self.assertEqual(checkpoint, {'next': self.endpoint + '?page=3',
+                                      'offset': 2 * self.per_page,
+                                      'count': self.total})
+        self.assertEqual(checkpoint, json.loads(json.dumps(checkpoint)))
+
+        calls = len(responses.calls)
+        resumed = PaginatedResourceList(int, self.endpoint,
+                                        checkpoint=checkpoint)
+        self.assertEqual(len(resumed), self.total)
+        self.assertEqual(list(resumed), list(range(2 * self.per_page,
+                                                   self.total)))
+        self.assertEqual(resumed[-1], self.total - 1)
+        with self.assertRaises(IndexError):
+            resumed[0]
+        self.assertEqual(len(responses.calls) - calls, self.pages - 2)
+        with self.assertRaises(strongarm.StrongarmException):
+            resumed.shards(2)
+
+        # The checkpoint after the last page has nothing left to fetch.
+        checkpoints = [c for _, c in resumed.pages()]
+        self.assertEqual(checkpoints[-1]['next'], None)
+        finished = PaginatedResourceList(int, self.endpoint,
+                                         checkpoint=checkpoints[-1])
+        self.assertEqual(list(finished), [])
+        self.assertEqual(list(finished.pages()), [])
+
+
+class TenantTestCase(unittest.TestCase):
+
+    endpoint = 'http://example.com/tenants'
+
+    def setUp(self):
+        """
+        Set up an endpoint listing two pages of each tenant's own data, and
+        rejecting unknown keys.
+
+        """
+        def tenant_resource(request):
+            key = request.headers['Authorization'][len('Token '):]
+            if not key.startswith('tenant'):
+                return (401, {}, json.dumps({'detail': 'Invalid token.'}))
+
+            page = 2 if 'page=2' in request.url else 1
+            next_url = self.endpoint + '?page=2' if page == 1 else None
+            response = {'count': 2, 'next': next_url,
+                        'results': ['%s-%d' % (key, page)]}
+            return (200, {}, json.dumps(response))
+
+        responses.add_callback(responses.GET, self.endpoint,
+                               callback=tenant_resource,
+                               content_type='application/json')
+
+    @responses.activate
+    def test_tenant(self):
+        """
+        Test that a list created for a tenant fetches later pages with the
+        tenant's credentials.
+
+        """
+        with Tenant('tenant-a'):
+            plist = PaginatedResourceList(str, self.endpoint)
+        self.assertEqual(list(plist), ['tenant-a-1', 'tenant-a-2'])
+
+        with Tenant('tenant-a'):
+            self.assertEqual(request('get', self.endpoint)['results'],
+                             ['tenant-a-1'])
+            self.assertEqual(request('get', self.endpoint, api_key='tenant-b')
+                             ['results'], ['tenant-b-1'])
+
+    @responses.activate
+    def test_fan_out(self):
+        """
+        Test that fanning out yields every tenant's results, isolating
+        failures to the tenant they occurred for.
+
+        """
+        tenants = [Tenant('tenant-%d' % i, name=i) for i in range(5)]
+        tenants.append('bad-key')
+
+        results = list(fan_out(
+            lambda t: list(PaginatedResourceList(str, self.endpoint)),
+            tenants, workers=3))
+        self.assertEqual(len(results), 6)
+
+        by_name = dict((tenant.name, (result, error))
+                       for tenant, result, error in results)
+        for i in range(5):
+            self.assertEqual(by_name[i], (['tenant-%d-1' % i,
+                                           'tenant-%d-2' % i], None))
+        result, error = by_name['...-key']
+        self.assertIsNone(result)
+        self.assertIsInstance(error, strongarm.StrongarmUnauthorized)
+
+    def test_name(self):
+        """
+        Test that the API key is masked in the default name and repr.
+
+        """
+        tenant = Tenant('secret-token-1234')
+        self.assertEqual(tenant.name, '...1234')
+        self.assertNotIn('secret', repr(tenant))
+        self.assertEqual(Tenant('secret', name='Acme').name, 'Acme')
+
+
+class AdaptiveLimitTestCase(unittest.TestCase):
+
+    def test_increase_and_throttle(self):
+        """
+        Test that the limit grows while calls succeed quickly, is capped, and
+        is halved when calls are throttled.
+
+        """
+        limit = AdaptiveLimit(initial=2, maximum=6)
+        ok = limit.wrap(lambda: None)
+
+        def throttled():
+            raise strongarm.StrongarmHttpError(429, 'Request was throttled.')
+        throttled = limit.wrap(throttled)
+
+        for _ in range(3):
+            ok()
+        self.assertEqual(limit.limit, 3)
+        for _ in range(100):
+            ok()
+        self.assertEqual(limit.limit, 6)
+        self.assertEqual(metrics.get('concurrency_limit'), 6)
+
+        with self.assertRaises(strongarm.StrongarmHttpError):
+            throttled()
+        self.assertEqual(limit.limit, 3)
+        for _ in range(3):
+            with self.assertRaises(strongarm.StrongarmHttpError):
+                throttled()
+        self.assertEqual(limit.limit, 1)
+        self.assertEqual(metrics.get('concurrency_limit'), 1)
+
+    def test_other_errors(self):
+        """
+        Test that errors which are not throttling leave the limit alone.
+
+        """
+        limit = AdaptiveLimit(initial=4)
+
+        def missing():
+            raise strongarm.StrongarmHttpError(404, 'Not found.')
+
+        def broken():
+            raise ValueError('Bug')
+
+        with self.assertRaises(strongarm.StrongarmHttpError):
+            limit.wrap(missing)()
+        for _ in range(40):
+            with self.assertRaises(ValueError):
+                limit.wrap(broken)()
+        self.assertEqual(limit.limit, 4)
+
+    def test_circuit_open(self):
+        """
+        Test that calls rejected by a circuit breaker are overload.
+
+        """
+        limit = AdaptiveLimit(initial=4)
+
+        def rejected():
+            raise strongarm.StrongarmCircuitOpen('example.com', 1)
+
+        with self.assertRaises(strongarm.StrongarmCircuitOpen):
+            limit.wrap(rejected)()
+        self.assertEqual(limit.limit, 2)
+
+    def test_bounded(self):
+        """
+        Test that the bulk helpers keep the calls in flight within the limit.
+
+        """
+        limit = AdaptiveLimit(initial=2, maximum=2)
+        lock = threading.Lock()
+        in_flight = [0]
+        peak = [0]
+
+        def call(item):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return item * 2
+
+        results = _run_bounded(call, range(10), workers=limit)
+        self.assertEqual([r for _, r, _ in results], list(range(0, 20, 2)))
+        self.assertEqual(sorted(_pipeline(call, range(10), limit,
+                                          ordered=False)),
+                         list(range(0, 20, 2)))
+        self.assertLessEqual(peak[0], 2)
+
+
+class HedgingTestCase(unittest.TestCase):
+
+    endpoint = 'http://example.com/hedged'
+
+    def setUp(self):
+        """
+        Set up a handler which is slow to answer the requests numbered in
+        `self.slow`.
+
+        """
+        self.slow = set()
+        self.calls = []
+        lock = threading.Lock()
+
+        def handler(request):
+            with lock:
+                number = len(self.calls)
+                self.calls.append(request.method)
+            if number in self.slow:
+                time.sleep(0.5)
+            return (200, {}, {'number': number})
+
+        self.transport = InProcessTransport(handler)
+        metrics.reset()
+
+    def warm_up(self, hedging, count=20):
+        for _ in range(count):
+            request('get', self.endpoint, transport=self.transport,
+                    hedging=hedging)
+
+    def test_hedge_wins(self):
+        """
+        Test that a slow GET is duplicated and the faster response used.
+
+        """
+        hedging = Hedging(budget=0.1, min_samples=20)
+        self.assertIsNone(hedging.delay())
+        self.warm_up(hedging)
+        self.assertAlmostEqual(hedging.delay(), 0.01, delta=0.01)
+
+        self.slow.add(20)
+        started = time.time()
+        data = request('get', self.endpoint, transport=self.transport,
+                       hedging=hedging)
+        self.assertLess(time.time() - started, 0.4)
+        self.assertEqual(data, {'number': 21})
+        self.assertEqual(metrics.get('hedges_sent'), 1)
+        self.assertEqual(metrics.get('hedges_won'), 1)
+
+    def test_budget(self):
+        """
+        Test that hedges are limited to the budget.
+
+        """
+        hedging = Hedging(budget=0.05, min_samples=5)
+        self.warm_up(hedging, 5)
+
+        self.slow.add(5)
+        data = request('get', self.endpoint, transport=self.transport,
+                       hedging=hedging)
+        self.assertEqual(data, {'number': 5})
+        self.assertEqual(metrics.get('hedges_sent'), 0)
+
+    def test_inline(self):
+        """
+        Test that requests are sent on the calling thread while no hedge is
+        possible.
+
+        """
+        threads = []
+
+        def send():
+            threads.append(threading.current_thread())
+
+        hedging = Hedging(budget=0, min_samples=2)
+        for _ in range(4):
+            hedging.send(send)
+        self.assertEqual(threads, [threading.current_thread()] * 4)
+
+    def test_base_exception(self):
+        """
+        Test that an attempt raising a BaseException does not leave the
+        caller waiting.
+
+        """
+        class Interrupted(BaseException):
+            pass
+
+        def send():
+            raise Interrupted()
+
+        hedging = Hedging(budget=1, min_samples=1)
+        hedging.send(lambda: None)
+        with self.assertRaises(Interrupted):
+            hedging.send(send)
+
+    def test_not_get(self):
+        """
+        Test that only GET requests are hedged, and only when enabled.
+
+        """
+        strongarm.hedging = Hedging(budget=1, min_samples=1)
+        try:
+            self.slow.update([1, 2])
+            request('get', self.endpoint, transport=self.transport)
+            request('post', self.endpoint, transport=self.transport)
+            request('get', self.endpoint, transport=self.transport,
+                    hedging=False)
+        finally:
+            strongarm.hedging = None
+        self.assertEqual(self.calls, ['GET', 'POST', 'GET'])
+        self.assertEqual(metrics.get('hedges_sent'), 0)
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    endpoint = 'http://example.com/breaker'
+
+    def setUp(self):
+        """
+        Set up a handler answering with the statuses queued in `self.statuses`
+        (200 once they run out), and record state changes.
+
+        """
+        self.statuses = []
+        self.calls = 0
+        self.changes = []
+
+        def handler(request):
+            self.calls += 1
+            status = self.statuses.pop(0) if self.statuses else 200
+            return (status, {}, {'detail': 'Status %d' % status})
+
+        self.transport = InProcessTransport(handler)
+        strongarm.circuit_breaker = CircuitBreaker(
+            failure_threshold=3, reset_timeout=0.05,
+            on_state_change=lambda *args: self.changes.append(args))
+        metrics.reset()
+
+    def tearDown(self):
+        strongarm.circuit_breaker = None
+
+    def get(self):
+        return request('get', self.endpoint, transport=self.transport)
+
+    def test_open_and_close(self):
+        """
+        Test that the circuit opens after consecutive failures, rejects
+        requests without sending them, and closes after a successful probe.
+
+        """
+        breaker = strongarm.circuit_breaker
+        self.statuses = [500, 404, 500, 503, 502]
+
+        for _ in range(5):
+            with self.assertRaises(strongarm.StrongarmHttpError):
+                self.get()
+        self.assertEqual(breaker.state('example.com'), CircuitBreaker.OPEN)
+
+        with self.assertRaises(strongarm.StrongarmCircuitOpen) as exp:
+            self.get()
+        self.assertEqual(exp.exception.host, 'example.com')
+        self.assertEqual(self.calls, 5)
+        self.assertEqual(metrics.get('circuit_rejections'), 1)
+
+        # A failed probe opens the circuit again.
+        self.statuses = [500]
+        time.sleep(0.06)
+        with self.assertRaises(strongarm.StrongarmHttpError):
+            self.get()
+        with self.assertRaises(strongarm.StrongarmCircuitOpen):
+            self.get()
+
+        time.sleep(0.06)
+        self.assertEqual(self.get(), {'detail': 'Status 200'})
+        self.assertEqual(breaker.state('example.com'), CircuitBreaker.CLOSED)
+
+        self.assertEqual(self.changes, [
+            ('example.com', 'closed', 'open'),
+            ('example.com', 'open', 'half-open'),
+            ('example.com', 'half-open', 'open'),
+            ('example.com', 'open', 'half-open'),
+            ('example.com', 'half-open', 'closed'),
+        ])
+        self.assertEqual(metrics.get('circuits_opened'), 2)
+        self.assertEqual(metrics.get('circuits_closed'), 1)
+
+    def test_slow(self):
+        """
+        Test that slow responses count as failures.
+
+        """
+        breaker = strongarm.circuit_breaker
+        breaker.slow_threshold = 0.01
+
+        def slow(request):
+            time.sleep(0.02)
+            return (200, {}, {})
+
+        transport = InProcessTransport(slow)
+        for _ in range(3):
+            request('get', self.endpoint, transport=transport)
+        self.assertEqual(breaker.state('example.com'), CircuitBreaker.OPEN)
+
+    def test_hosts(self):
+        """
+        Test that each host has its own circuit.
+
+        """
+        self.statuses = [500] * 3
+        for _ in range(3):
+            with self.assertRaises(strongarm.StrongarmHttpError):
+                self.get()
+
+        self.assertEqual(request('get', 'http://example.org/breaker',
+                                 transport=self.transport),
+                         {'detail': 'Status 200'})
+
+
+class PageParserTestCase(unittest.TestCase):
+
+    def chunked(self, text, size):
+        data = text.encode('utf-8')
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_parse_incrementally(self):
+        """
+        Test that a page split into arbitrary chunks is parsed into the same
+        keys and elements, in order, regardless of the key order.
+
+        """
+        page = ('{"results": [{"name": "\u00e9.example.com", "n": 12345},'
+                ' [1, 2], "x", 67890], "next": null, "count": 42}')
+
+        for size in (1, 2, 3, 7, len(page)):
+            self.assertEqual(list(_iter_page(self.chunked(page, size))),
+                             [('results', {'name': u'\u00e9.example.com',
+                                           'n': 12345}),
+                              ('results', [1, 2]),
+                              ('results', 'x'),
+                              ('results', 67890),
+                              ('next', None),
+                              ('count', 42)])
+
+    def test_parse_yields_early(self):
+        """
+        Test that elements are yielded before the rest of the page is read.
+
+        """
+        chunks = self.chunked('{"count": 2, "results": [1, 2]}', 4)
+        read = []
+
+        def reader():
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+        page = _iter_page(reader())
+        self.assertEqual(next(page), ('count', 2))
+        self.assertEqual(next(page), ('results', 1))
+        self.assertLess(len(read), len(chunks))
+
+    def test_parse_split_anywhere(self):
+        """
+        Test that a page split in two at any offset is parsed the same.
+
+        """
+        page = (b'{"count": 2, "results": [12.5, 3e2, -7, true, null, '
+                b'"a\\"b"], "next": null}')
+        expected = [('count', 2), ('results', 12.5), ('results', 300.0),
+                    ('results', -7), ('results', True), ('results', None),
+                    ('results', 'a"b'), ('next', None)]
+
+        for i in range(len(page) + 1):
+            self.assertEqual(list(_iter_page([page[:i], page[i:]])), expected,
+                             i)
+
+    def test_parse_empty_results(self):
+        self.assertEqual(list(_iter_page([b'{"count": 0, "results": []}'])),
+                         [('count', 0)])
+
+    def test_parse_error(self):
+        """
+        Test that a malformed or truncated page raises StrongarmException.
+
+        """
+        with self.assertRaises(strongarm.StrongarmException):
+            list(_iter_page([b'{"count": 2, "results": [1, ']))
+        with self.assertRaises(strongarm.StrongarmException):
+            list(_iter_page([b'<h1>Bad request</h1>']))
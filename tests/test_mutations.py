@@ -0,0 +1,155 @@
+"""Tests for strongarm.mutations."""
+
+import json
+import unittest
+
+import responses
+
+import strongarm
+from strongarm.common import Tenant
+from strongarm.mutations import MutationQueue
+from strongarm.resources import Domain
+from strongarm.transports import InProcessTransport
+
+
+class MutationQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        def create(request):
+            return (201, {}, request.body)
+
+        responses.add_callback(responses.POST, strongarm.host + Domain.endpoint,
+                               callback=create,
+                               content_type='application/json')
+
+    def add_delete(self, name, status=204):
+        responses.add(responses.DELETE,
+                      strongarm.host + Domain.endpoint + name + '/',
+                      status=status)
+
+    def calls(self):
+        return [(c.request.method, c.request.url,
+                 json.loads(c.request.body) if c.request.body else None)
+                for c in responses.calls]
+
+    @responses.activate
+    def test_merge(self):
+        """
+        Test that pending changes to the same domain are merged before being
+        applied.
+
+        """
+        self.add_delete('replaced.example.com')
+        self.add_delete('deleted.example.com')
+
+        queue = MutationQueue(Domain, flush_interval=60)
+        queue.create('new.example.com', status=Domain.WHITELISTED)
+        queue.create('new.example.com', status=Domain.BLACKLISTED)
+        queue.create('cancelled.example.com')
+        queue.delete('cancelled.example.com')
+        queue.delete('replaced.example.com')
+        queue.create('replaced.example.com')
+        queue.delete('deleted.example.com')
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(len(responses.calls), 0)
+
+        queue.flush()
+        self.assertEqual(len(queue), 0)
+
+        calls = self.calls()
+        self.assertEqual(len(calls), 4)
+        endpoint = strongarm.host + Domain.endpoint
+        self.assertIn(('POST', endpoint,
+                       {'name': 'new.example.com', 'status': 'blacklisted'}),
+                      calls)
+        self.assertIn(('DELETE', endpoint + 'deleted.example.com/', None), calls)
+        # A replacement deletes before creating.
+        self.assertLess(
+            calls.index(('DELETE', endpoint + 'replaced.example.com/', None)),
+            calls.index(('POST', endpoint, {'name': 'replaced.example.com'})))
+
+        queue.close()
+
+    @responses.activate
+    def test_batch_size(self):
+        """
+        Test that a full batch is applied without waiting for the interval.
+
+        """
+        applied = []
+
+        with MutationQueue(Domain, batch_size=5, flush_interval=60,
+                           on_success=lambda *args: applied.append(args)) as queue:
+            for i in range(5):
+                queue.create('%d.example.com' % i)
+
+            # Waits for the batch which is already being applied.
+            queue.flush()
+            self.assertEqual(len(applied), 5)
+            self.assertEqual(set(a[1] for a in applied), set(['create']))
+
+        with self.assertRaises(strongarm.StrongarmException):
+            queue.create('closed.example.com')
+
+    @responses.activate
+    def test_flush_interval(self):
+        """
+        Test that pending changes are applied after the flush interval.
+
+        """
+        queue = MutationQueue(Domain, flush_interval=0.01)
+        queue.create('0.example.com')
+        queue.flush()
+        self.assertEqual(len(responses.calls), 1)
+        queue.close()
+
+    @responses.activate
+    def test_errors(self):
+        """
+        Test that failed changes are reported to the callback and collected.
+
+        """
+        self.add_delete('missing.example.com', status=404)
+        errors = []
+
+        with MutationQueue(Domain, on_error=lambda *args: errors.append(args)) as queue:
+            queue.delete('missing.example.com')
+            queue.create('ok.example.com')
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][:2], ('missing.example.com', 'delete'))
+        self.assertEqual(errors[0][2].status_code, 404)
+        self.assertEqual(queue.failed, [errors[0]])
+
+    def test_flush_cancelled(self):
+        """
+        Test that flushing returns when every change has cancelled out.
+
+        """
+        with MutationQueue(Domain, flush_interval=60) as queue:
+            queue.create('0.example.com')
+            queue.delete('0.example.com')
+            queue.flush()
+            self.assertEqual(len(queue), 0)
+
+    def test_tenant(self):
+        """
+        Test that changes queued inside a Tenant are applied with its
+        credentials.
+
+        """
+        auth = []
+
+        def handler(request):
+            auth.append(request.headers['Authorization'])
+            return (201, {}, request.json())
+
+        strongarm.transport = InProcessTransport(handler)
+        try:
+            with Tenant('tenant-a'):
+                with MutationQueue(Domain) as queue:
+                    queue.create('x.example.com')
+        finally:
+            strongarm.transport = None
+
+        self.assertEqual(auth, ['Token tenant-a'])
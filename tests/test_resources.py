@@ -3,9 +3,16 @@
 import json
 import unittest
 
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
 import responses
+from six.moves.urllib.parse import parse_qs, urlparse
 
 import strongarm
+from strongarm.common import PaginatedResourceList, _INTEGER_TYPECODE
 from strongarm.resources import Domain, Infection
 
 
@@ -182,6 +189,219 @@ class DomainTestCase(unittest.TestCase):
         self.assertEqual(len(responses.calls), 1)
         self.assertEqual(exp.exception.status_code, 404)
 
+    reconcile_response = {
+        "count": 4,
+        "next": None,
+        "previous": None,
+        "results": [
+            {"name": "keep.example.com", "status": "blacklisted"},
+            {"name": "stale.example.com", "status": "blacklisted"},
+            {"name": "allowed.example.com", "status": "whitelisted"},
+            {"name": "other.example.com", "status": "whitelisted"},
+        ]
+    }
+
+    def add_reconcile_responses(self):
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps(self.reconcile_response),
+                      content_type='application/json')
+
+        def create(request):
+            return (201, {}, request.body)
+
+        responses.add_callback(responses.POST, strongarm.host + Domain.endpoint,
+                               callback=create,
+                               content_type='application/json')
+        for result in self.reconcile_response['results']:
+            responses.add(responses.DELETE,
+                          strongarm.host + Domain.endpoint + result['name'] + '/',
+                          status=204)
+
+    @responses.activate
+    def test_reconcile_dry_run(self):
+        """
+        Test that a dry run reconciliation computes the changes from a single
+        listing without modifying anything.
+
+        """
+
+        self.add_reconcile_responses()
+
+        desired = ['keep.example.com', 'new.example.com', 'allowed.example.com']
+        result = Domain.reconcile(desired, dry_run=True)
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertTrue(result.dry_run)
+        self.assertEqual(result.created, ['new.example.com'])
+        self.assertEqual(result.deleted, ['stale.example.com'])
+        self.assertEqual(result.updated, ['allowed.example.com'])
+        self.assertEqual(len(result), 3)
+
+    @responses.activate
+    def test_reconcile(self):
+        """
+        Test that reconciliation only creates, deletes, and re-creates the
+        domains that differ from the desired state.
+
+        """
+
+        self.add_reconcile_responses()
+
+        desired = ['keep.example.com', 'new.example.com', 'allowed.example.com']
+        result = Domain.reconcile(desired, workers=2)
+
+        self.assertEqual(result.failed, {})
+
+        calls = [(c.request.method, c.request.url) for c in responses.calls]
+        # One listing, one create, one delete and a delete plus create for
+        # the status change.
+        self.assertEqual(len(calls), 5)
+        self.assertIn(('DELETE', strongarm.host + Domain.endpoint +
+                       'stale.example.com/'), calls)
+        self.assertIn(('DELETE', strongarm.host + Domain.endpoint +
+                       'allowed.example.com/'), calls)
+
+        created = [json.loads(c.request.body) for c in responses.calls
+                   if c.request.method == 'POST']
+        self.assertEqual(
+            sorted(created, key=lambda d: d['name']),
+            [{'name': 'allowed.example.com', 'status': Domain.BLACKLISTED},
+             {'name': 'new.example.com', 'status': Domain.BLACKLISTED}])
+
+    @responses.activate
+    def test_reconcile_failure(self):
+        """
+        Test that a failed change is reported without aborting the others.
+
+        """
+
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps(self.reconcile_response),
+                      content_type='application/json')
+        responses.add(responses.POST, strongarm.host + Domain.endpoint,
+                      status=400, content_type='application/json',
+                      body=json.dumps({'detail': 'Invalid domain.'}))
+        responses.add(responses.DELETE,
+                      strongarm.host + Domain.endpoint + 'stale.example.com/',
+                      status=204)
+
+        result = Domain.reconcile(['keep.example.com', 'bad'])
+
+        self.assertEqual(list(result.failed), ['bad'])
+        self.assertEqual(result.failed['bad'].status_code, 400)
+        self.assertEqual(result.deleted, ['stale.example.com'])
+
+    @responses.activate
+    def test_snapshot(self):
+        """
+        Test that with a snapshot enabled, get, filter and all are answered
+        from memory with the usual return types.
+
+        """
+
+        self.add_reconcile_responses()
+
+        snapshot = Domain.enable_snapshot(interval=3600)
+        try:
+            self.assertEqual(len(responses.calls), 1)
+
+            domain = Domain.get('keep.example.com')
+            self.assertIsInstance(domain, Domain)
+            self.assertEqual(domain.status, Domain.BLACKLISTED)
+
+            # Instances missing from the snapshot are looked up in the API.
+            responses.add(responses.GET, strongarm.host + Domain.endpoint +
+                          'new.example.com/',
+                          body=json.dumps({'name': 'new.example.com'}),
+                          content_type='application/json')
+            self.assertEqual(Domain.get('new.example.com').name,
+                             'new.example.com')
+            self.assertEqual(len(responses.calls), 2)
+
+            domains = Domain.filter(statuses=Domain.WHITELISTED)
+            self.assertIsInstance(domains, PaginatedResourceList)
+            self.assertEqual([d.name for d in domains],
+                             ['allowed.example.com', 'other.example.com'])
+            self.assertEqual(len(Domain.filter(statuses=[Domain.WHITELISTED,
+                                                         Domain.BLACKLISTED])),
+                             4)
+            self.assertEqual(len(Domain.all()), 4)
+            self.assertEqual(Domain.all()[1].name, 'stale.example.com')
+
+            self.assertEqual(len(responses.calls), 2)
+
+            # Live reads and reconciliation bypass the snapshot.
+            Domain.all(live=True)
+            Domain.filter(live=True, statuses=Domain.WHITELISTED)
+            Domain.reconcile([], dry_run=True)
+            self.assertEqual(len(responses.calls), 5)
+
+            # Once the snapshot is stale the API is used again.
+            snapshot.max_age = -1
+            Domain.filter(statuses=Domain.WHITELISTED)
+            self.assertEqual(len(responses.calls), 6)
+        finally:
+            Domain.disable_snapshot()
+
+        self.assertIsNone(Domain.snapshot)
+        Domain.all()
+        self.assertEqual(len(responses.calls), 7)
+
+    @responses.activate
+    def test_count_exists_first(self):
+        """
+        Test that count, exists and first request a single element and pass
+        on the filters.
+
+        """
+
+        page = dict(self.list_response, results=self.list_response['results'][:1])
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps(page), content_type='application/json')
+
+        self.assertEqual(Domain.count(statuses=Domain.BLACKLISTED), 5)
+        self.assertTrue(Domain.exists())
+        first = Domain.first()
+        self.assertIsInstance(first, Domain)
+        self.assertEqual(first.name, '0.example.com')
+
+        self.assertEqual(len(responses.calls), 3)
+        params = parse_qs(urlparse(responses.calls[0].request.url).query)
+        self.assertEqual(params, {'page_size': ['1'],
+                                  'statuses': [Domain.BLACKLISTED]})
+
+        with self.assertRaises(ValueError):
+            Domain.count(names='example.com')
+
+    @responses.activate
+    def test_count_empty(self):
+        """
+        Test that exists and first handle an empty list.
+
+        """
+
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps({'count': 0, 'next': None,
+                                       'previous': None, 'results': []}),
+                      content_type='application/json')
+
+        self.assertEqual(Domain.count(), 0)
+        self.assertFalse(Domain.exists())
+        self.assertIsNone(Domain.first())
+
+    @responses.activate
+    def test_list_count(self):
+        """
+        Test that a PaginatedResourceList reports its count.
+
+        """
+
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps(self.list_response),
+                      content_type='application/json')
+
+        self.assertEqual(Domain.all().count(), self.list_response['count'])
+
 
 class InfectionTestCase(unittest.TestCase):
 
@@ -320,3 +540,60 @@ class InfectionTestCase(unittest.TestCase):
 
         # Deletion is not possible.
         self.assertFalse(hasattr(infection, 'delete'))
+
+    @responses.activate
+    def test_to_arrays(self):
+        """
+        Test that infections are loaded into typed, flattened columns both from
+        the page already read and from the pages streamed afterwards.
+
+        """
+        first, second = [dict(r) for r in self.list_response['results']]
+        second['location'] = {'country': 'US', 'asn': 7922}
+        pages = [
+            {'count': 2, 'next': strongarm.host + Infection.endpoint + '?page=2',
+             'results': [first]},
+            {'count': 2, 'next': None, 'results': [second]},
+        ]
+
+        def paginated(request):
+            params = parse_qs(urlparse(request.url).query)
+            page = int(params['page'][0]) if 'page' in params else 1
+            return (200, {}, json.dumps(pages[page - 1]))
+
+        responses.add_callback(responses.GET, strongarm.host + Infection.endpoint,
+                               callback=paginated,
+                               content_type='application/json')
+
+        arrays = Infection.all(stream=True).to_arrays()
+        self.assertEqual(len(responses.calls), 2)
+
+        self.assertEqual(list(arrays)[:2], ['id', 'port'])
+        self.assertEqual(arrays['id'], ['MgEqqxrm', 'l3JPB8fo'])
+        self.assertEqual(arrays['port'].typecode, _INTEGER_TYPECODE)
+        self.assertEqual(list(arrays['port']), [80, 6667])
+        self.assertEqual(arrays['resolved'], [False, False])
+        self.assertEqual(arrays['dest_domain'], ['0.example.com', None])
+        self.assertEqual(arrays['location.country'], [None, 'US'])
+        self.assertEqual(arrays['location.asn'].typecode, 'd')
+        self.assertNotEqual(arrays['location.asn'][0], arrays['location.asn'][0])
+        self.assertEqual(arrays['location.asn'][1], 7922)
+
+        arrays = Infection.all().to_arrays(columns=['location.asn', 'missing'])
+        self.assertEqual(list(arrays), ['location.asn', 'missing'])
+        self.assertEqual(len(arrays['missing']), 2)
+
+    @unittest.skipIf(pandas is None, "pandas is not installed")
+    @responses.activate
+    def test_to_frame(self):
+        """
+        Test that infections can be loaded into a DataFrame.
+
+        """
+        responses.add(responses.GET, strongarm.host + Infection.endpoint,
+                      body=json.dumps(self.list_response),
+                      content_type='application/json')
+
+        frame = Infection.all().to_frame(columns=['id', 'port'])
+        self.assertEqual(list(frame.columns), ['id', 'port'])
+        self.assertEqual(list(frame['port']), [80, 6667])
@@ -0,0 +1,104 @@
+"""Tests for strongarm.snapshotfile."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import responses
+
+import strongarm
+from strongarm.resources import Domain
+from strongarm.snapshotfile import SnapshotFile, write_snapshot
+
+
+class SnapshotFileTestCase(unittest.TestCase):
+
+    list_response = {
+        "count": 4,
+        "next": None,
+        "previous": None,
+        "results": [
+            {"name": "b.example.com", "status": "blacklisted"},
+            {"name": "A.example.com", "status": "whitelisted"},
+            {"name": "d.example.com", "status": "filtered"},
+            {"name": "c.example.com", "status": "blacklisted"},
+        ]
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'domains.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @responses.activate
+    def test_write_and_lookup(self):
+        """
+        Test that a snapshot built from Domain.all() answers lookups by name
+        case-insensitively and iterates in sorted order.
+
+        """
+
+        responses.add(responses.GET, strongarm.host + Domain.endpoint,
+                      body=json.dumps(self.list_response),
+                      content_type='application/json')
+
+        self.assertEqual(write_snapshot(self.path), 4)
+        self.assertEqual(os.listdir(self.directory), ['domains.snapshot'])
+
+        snapshot = SnapshotFile(self.path)
+        self.assertEqual(len(snapshot), 4)
+        self.assertEqual(snapshot.status('a.example.com'), Domain.WHITELISTED)
+        self.assertEqual(snapshot.status('C.EXAMPLE.COM'), Domain.BLACKLISTED)
+        self.assertIn('d.example.com', snapshot)
+        self.assertNotIn('e.example.com', snapshot)
+        self.assertNotIn('0.example.com', snapshot)
+        self.assertRaises(KeyError, snapshot.status, 'e.example.com')
+
+        self.assertEqual(list(snapshot),
+                         [('a.example.com', 'whitelisted'),
+                          ('b.example.com', 'blacklisted'),
+                          ('c.example.com', 'blacklisted'),
+                          ('d.example.com', 'filtered')])
+
+    def test_lookup_many(self):
+        """
+        Test that every domain of a larger snapshot is found.
+
+        """
+
+        domains = [Domain({'name': '%d.example.com' % i,
+                           'status': Domain.BLACKLISTED if i % 2 else None})
+                   for i in range(1000)]
+        write_snapshot(self.path, domains)
+
+        snapshot = SnapshotFile(self.path)
+        for i in range(1000):
+            self.assertEqual(snapshot.status('%d.example.com' % i),
+                             Domain.BLACKLISTED if i % 2 else None)
+        self.assertNotIn('1000.example.com', snapshot)
+
+    def test_swap(self):
+        """
+        Test that a newer snapshot replacing the file is swapped in.
+
+        """
+
+        write_snapshot(self.path, [Domain({'name': 'old.example.com'})])
+        snapshot = SnapshotFile(self.path, check_interval=0)
+        self.assertIn('old.example.com', snapshot)
+
+        write_snapshot(self.path, [Domain({'name': 'new.example.com'}),
+                                   Domain({'name': 'newer.example.com'})])
+        self.assertIn('new.example.com', snapshot)
+        self.assertNotIn('old.example.com', snapshot)
+        self.assertEqual(len(snapshot), 2)
+        self.assertFalse(snapshot.reload())
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 64)
+        self.assertRaises(strongarm.StrongarmException, SnapshotFile, self.path)
@@ -0,0 +1,122 @@
+"""Startup benchmarks for short-lived processes using strongarm."""
+
+import json
+import subprocess
+import sys
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer
+
+
+# Each benchmark runs in a fresh interpreter and prints its timings as JSON.
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.time()
+import strongarm
+elapsed = time.time() - start
+print(json.dumps({'import': elapsed,
+                  'requests_loaded': 'requests' in sys.modules}))
+"""
+
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+start = time.time()
+import strongarm
+strongarm.host = sys.argv[1]
+strongarm.api_key = 'token'
+domain = strongarm.Domain.get('example.com')
+elapsed = time.time() - start
+print(json.dumps({'first_request': elapsed, 'name': domain.name}))
+"""
+
+
+NAMESPACE_SCRIPT = """
+import json
+import strongarm
+exported = {}
+exec('from strongarm import *', exported)
+print(json.dumps({'exported': sorted(exported),
+                  'common': strongarm.common.__name__,
+                  'resources': strongarm.resources.Domain.__name__}))
+"""
+
+
+class DomainHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = json.dumps({'name': 'example.com'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StartupTestCase(unittest.TestCase):
+
+    # Generous budgets in seconds, which only catch gross regressions. The
+    # measured timings are reported when a budget is exceeded.
+    import_budget = 0.5
+    first_request_budget = 5.0
+
+    def run_script(self, script, *args):
+        output = subprocess.check_output([sys.executable, '-c', script] +
+                                         list(args))
+        return json.loads(output.decode('utf-8'))
+
+    def test_import(self):
+        """
+        Test that importing strongarm is fast and does not load requests or
+        the resource modules until they are used.
+
+        """
+
+        timings = self.run_script(IMPORT_SCRIPT)
+
+        # Lazy loading relies on module level __getattr__ from Python 3.7.
+        if sys.version_info >= (3, 7):
+            self.assertFalse(timings['requests_loaded'])
+        self.assertLess(timings['import'], self.import_budget, timings)
+
+    def test_first_request(self):
+        """
+        Test the time from starting to import strongarm until the first
+        response from a local server has been parsed.
+
+        """
+
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), DomainHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        try:
+            host = 'http://127.0.0.1:%d' % server.server_address[1]
+            timings = self.run_script(FIRST_REQUEST_SCRIPT, host)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(timings['name'], 'example.com')
+        self.assertLess(timings['first_request'], self.first_request_budget,
+                        timings)
+
+    def test_namespace(self):
+        """
+        Test that star imports export the public names and that submodules
+        are available as attributes after `import strongarm`.
+
+        """
+
+        namespace = self.run_script(NAMESPACE_SCRIPT)
+
+        for name in ['Domain', 'Infection', 'StrongarmException',
+                     'StrongarmHttpError', 'StrongarmUnauthorized', 'host',
+                     'api_key']:
+            self.assertIn(name, namespace['exported'])
+        self.assertEqual(namespace['common'], 'strongarm.common')
+        self.assertEqual(namespace['resources'], 'Domain')
@@ -0,0 +1,194 @@
+"""Tests for strongarm.transports."""
+
+import json
+import threading
+import time
+import unittest
+import zlib
+
+from six.moves import BaseHTTPServer
+
+import strongarm
+from strongarm.common import request
+from strongarm.resources import Domain
+from strongarm.transports import (InProcessTransport, RequestsTransport,
+                                  Urllib3Transport)
+
+
+def gzip(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        body = json.dumps({'path': self.path,
+                           'auth': self.headers.get('Authorization')})
+        body = body.encode('utf-8')
+
+        if self.path.startswith('/cookie'):
+            body = json.dumps({'cookie': self.headers.get('Cookie')})
+            self.reply(200, body.encode('utf-8'),
+                       {'Set-Cookie': 'sessionid=%s; Path=/' % self.path})
+        elif self.path.startswith('/gzip'):
+            self.reply(200, gzip(body), {'Content-Encoding': 'gzip'})
+        elif self.path.startswith('/missing'):
+            self.reply(404, b'{"detail": "Not found."}')
+        elif self.path.startswith('/slow'):
+            time.sleep(0.5)
+            self.reply(200, body)
+        else:
+            self.reply(200, body)
+
+    def log_message(self, *args):
+        pass
+
+
+class NetworkTransportTestCase(object):
+    """
+    Tests run against a local server for each transport using the network.
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_get(self):
+        strongarm.api_key = 'token'
+        data = request('get', self.url + '/ok', params={'a': ['1', '2']},
+                       transport=self.transport)
+        self.assertEqual(data, {'path': '/ok?a=1&a=2', 'auth': 'Token token'})
+
+    def test_gzip(self):
+        data = request('get', self.url + '/gzip', transport=self.transport)
+        self.assertEqual(data['path'], '/gzip')
+
+    def test_error(self):
+        with self.assertRaises(strongarm.StrongarmHttpError) as exp:
+            request('get', self.url + '/missing', transport=self.transport)
+        self.assertEqual(exp.exception.status_code, 404)
+        self.assertEqual(exp.exception.detail, 'Not found.')
+
+    def test_no_cookies(self):
+        """
+        Test that cookies set by the server are not sent back, since they may
+        belong to another API key.
+
+        """
+        request('get', self.url + '/cookie/a', transport=self.transport)
+        data = request('get', self.url + '/cookie/b', transport=self.transport)
+        self.assertIsNone(data['cookie'])
+
+    def test_timeout(self):
+        with self.assertRaises(strongarm.StrongarmTimeout):
+            request('get', self.url + '/slow', timeout=(1, 0.05),
+                    transport=self.transport)
+
+
+class RequestsTransportTestCase(NetworkTransportTestCase, unittest.TestCase):
+
+    transport = RequestsTransport()
+
+    def test_pool_size(self):
+        """
+        Test that the default session keeps more connections than the workers
+        of the command line tool.
+
+        """
+        adapter = self.transport.session.get_adapter(self.url)
+        self.assertEqual(adapter._pool_maxsize, 64)
+
+
+class Urllib3TransportTestCase(NetworkTransportTestCase, unittest.TestCase):
+
+    transport = Urllib3Transport()
+
+
+class InProcessTransportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.domains = {}
+
+        def handler(request):
+            self.requests.append(request)
+            name = request.path[len(Domain.endpoint):].strip('/')
+
+            if request.method == 'POST':
+                domain = request.json()
+                self.domains[domain['name']] = domain
+                return (201, {}, domain)
+            elif request.method == 'DELETE':
+                del self.domains[name]
+                return (204, {}, None)
+            elif name:
+                if name not in self.domains:
+                    return (404, {}, {'detail': 'Not found.'})
+                return (200, {}, self.domains[name])
+
+            results = sorted(self.domains.values(), key=lambda d: d['name'])
+            if 'statuses' in request.params:
+                results = [d for d in results
+                           if d.get('status') in request.params['statuses']]
+            return (200, {}, {'count': len(results), 'next': None,
+                              'results': results})
+
+        strongarm.transport = InProcessTransport(handler)
+
+    def tearDown(self):
+        strongarm.transport = None
+
+    def test_resources(self):
+        """
+        Test that every resource operation can be served by a handler.
+
+        """
+        Domain.create(name='a.example.com', status=Domain.BLACKLISTED)
+        Domain.create(name='b.example.com', status=Domain.WHITELISTED)
+
+        self.assertEqual(Domain.get('a.example.com').status, Domain.BLACKLISTED)
+        self.assertEqual([d.name for d in Domain.all()],
+                         ['a.example.com', 'b.example.com'])
+        self.assertEqual([d.name for d in
+                          Domain.filter(statuses=Domain.WHITELISTED)],
+                         ['b.example.com'])
+        self.assertEqual(len(Domain.all(stream=True)), 2)
+
+        Domain.get('a.example.com').delete()
+        with self.assertRaises(strongarm.StrongarmHttpError) as exp:
+            Domain.get('a.example.com')
+        self.assertEqual(exp.exception.status_code, 404)
+
+        self.assertEqual(self.requests[0].headers['authorization'],
+                         'Token %s' % strongarm.api_key)
+
+    def test_compressed_body(self):
+        """
+        Test that the handler receives compressed request bodies decoded.
+
+        """
+        request('post', strongarm.host + Domain.endpoint,
+                data=json.dumps({'name': 'a.example.com'}), compress=True)
+
+        self.assertEqual(self.requests[0].headers['Content-Encoding'], 'gzip')
+        self.assertEqual(self.requests[0].json(), {'name': 'a.example.com'})